@@ -1,18 +1,114 @@
-import requests
-import json
+import http_client
+from graphql_batch import get_batcher
+import telemetry
+from pantry import get_pantry
+from http_cache import NO_VALIDATOR_TTL
 
 # AniList does NOT require a token for general browsing (public data),
 # which makes this explorer very easy for others to test!
 BASE_URL = "https://graphql.anilist.co"
 
 def run_query(query, variables=None):
-    """Helper function to send GraphQL requests"""
-    response = requests.post(BASE_URL, json={'query': query, 'variables': variables})
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"❌ Query failed with code {response.status_code}")
+    """Helper function to send GraphQL requests (batched with any other query sent at the same time)"""
+    cached = cached_reference(query)
+    if cached:
+        return cached
+    return store_reference(query, check_result(get_batcher(BASE_URL).execute(query, variables)))
+
+# GraphQL goes over POST, so there are no HTTP validators to revalidate with:
+# reference queries (genres, tags) are simply kept in the pantry for a month.
+def _reference_key(query):
+    return f"anilist:reference:{' '.join(query.split())}"
+
+def cached_reference(query):
+    return get_pantry().get(_reference_key(query)) if query in REFERENCE_QUERIES else None
+
+def store_reference(query, result):
+    if result and query in REFERENCE_QUERIES:
+        get_pantry().put(_reference_key(query), result, ttl=NO_VALIDATOR_TTL)
+    return result
+
+def check_result(result):
+    if result.get('errors'):
+        print(f"❌ Query failed: {result['errors'][0].get('message', 'unknown error')}")
         return None
+    return result
+
+# ==========================================
+# 📜 QUERIES & DISPLAYS FOR MENU OPTIONS 1-4
+# ==========================================
+GENRES_QUERY = """
+query {
+  GenreCollection
+  MediaTagCollection { name }
+}
+"""
+
+TRENDING_QUERY = """
+query {
+  Page(perPage: 10) {
+    media(sort: TRENDING_DESC, type: ANIME) {
+      title { english romaji }
+      averageScore
+      format
+    }
+  }
+}
+"""
+
+STAFF_QUERY = """
+query {
+  Page(perPage: 10) {
+    staff(sort: FAVOURITES_DESC) {
+      name { full }
+      primaryOccupations
+    }
+  }
+}
+"""
+
+STUDIOS_QUERY = """
+query {
+  Page(perPage: 10) {
+    studios(sort: FAVOURITES_DESC) {
+      name
+      favourites
+    }
+  }
+}
+"""
+
+def show_genres(data):
+    print("\n📂 OFFICIAL GENRES:")
+    print(", ".join(data['data']['GenreCollection']))
+    print(f"\n🏷️ TOTAL TAGS AVAILABLE: {len(data['data']['MediaTagCollection'])}")
+
+def show_trending(data):
+    print("\n📈 CURRENTLY TRENDING ANIME:")
+    for anime in data['data']['Page']['media']:
+        title = anime['title']['english'] or anime['title']['romaji']
+        score = anime['averageScore'] or "N/A"
+        print(f"[{score}%] {title[:40]:<40} | Format: {anime['format']}")
+
+def show_staff(data):
+    print("\n🎙️ MOST FAVORITED VOICE ACTORS/STAFF:")
+    for person in data['data']['Page']['staff']:
+        occ = person['primaryOccupations'][0] if person['primaryOccupations'] else "Staff"
+        print(f"Name: {person['name']['full']:<25} | Primary Role: {occ}")
+
+def show_studios(data):
+    print("\n🎨 TOP ANIMATION STUDIOS:")
+    for studio in data['data']['Page']['studios']:
+        print(f"Studio: {studio['name']:<25} | Fans: {studio['favourites']}")
+
+REFERENCE_QUERIES = {GENRES_QUERY}
+
+MENU_OPTIONS = {
+    '1': (GENRES_QUERY, show_genres),
+    '2': (TRENDING_QUERY, show_trending),
+    '3': (STAFF_QUERY, show_staff),
+    '4': (STUDIOS_QUERY, show_studios),
+}
 
 def explore_anilist():
     while True:
@@ -23,88 +119,40 @@ def explore_anilist():
         print("2. View Trending Anime This Season")
         print("3. View Top Voice Actors (Seiyuu)")
         print("4. View Top Animation Studios")
-        print("5. Exit Explorer")
+        print("5. View All of the Above (one request)")
+        print("6. Exit Explorer")
         
-        choice = input("\nEnter number (1-5): ")
-
-        if choice == '1':
-            # Queries the GenreCollection and MediaTagCollection
-            query = """
-            query {
-              GenreCollection
-              MediaTagCollection { name }
-            }
-            """
-            data = run_query(query)
-            if data:
-                print("\n📂 OFFICIAL GENRES:")
-                print(", ".join(data['data']['GenreCollection']))
-                print(f"\n🏷️ TOTAL TAGS AVAILABLE: {len(data['data']['MediaTagCollection'])}")
-
-        elif choice == '2':
-            # Queries for the top 10 trending shows right now
-            query = """
-            query {
-              Page(perPage: 10) {
-                media(sort: TRENDING_DESC, type: ANIME) {
-                  title { english romaji }
-                  averageScore
-                  format
-                }
-              }
-            }
-            """
-            data = run_query(query)
-            if data:
-                print("\n📈 CURRENTLY TRENDING ANIME:")
-                for anime in data['data']['Page']['media']:
-                    title = anime['title']['english'] or anime['title']['romaji']
-                    score = anime['averageScore'] or "N/A"
-                    print(f"[{score}%] {title[:40]:<40} | Format: {anime['format']}")
-
-        elif choice == '3':
-            # Queries for popular Voice Actors
-            query = """
-            query {
-              Page(perPage: 10) {
-                staff(sort: FAVOURITES_DESC) {
-                  name { full }
-                  primaryOccupations
-                }
-              }
-            }
-            """
-            data = run_query(query)
-            if data:
-                print("\n🎙️ MOST FAVORITED VOICE ACTORS/STAFF:")
-                for person in data['data']['Page']['staff']:
-                    occ = person['primaryOccupations'][0] if person['primaryOccupations'] else "Staff"
-                    print(f"Name: {person['name']['full']:<25} | Primary Role: {occ}")
-
-        elif choice == '4':
-            # Queries for top Animation Studios
-            query = """
-            query {
-              Page(perPage: 10) {
-                studios(sort: FAVOURITES_DESC) {
-                  name
-                  favourites
-                }
-              }
-            }
-            """
-            data = run_query(query)
-            if data:
-                print("\n🎨 TOP ANIMATION STUDIOS:")
-                for studio in data['data']['Page']['studios']:
-                    print(f"Studio: {studio['name']:<25} | Fans: {studio['favourites']}")
-
-        elif choice == '5':
-            print("👋 Closing AniList explorer. Sayonara!")
-            break
+        choice = input("\nEnter number (1-6): ")
+
+        try:
+            if choice in MENU_OPTIONS:
+                query, show = MENU_OPTIONS[choice]
+                data = run_query(query)
+                if data:
+                    show(data)
+
+            elif choice == '5':
+                # Options 1-4 merged into a single aliased GraphQL request (cached reference data left out)
+                cached = {query: cached_reference(query) for query, _ in MENU_OPTIONS.values()}
+                missing = [query for query, result in cached.items() if not result]
+                results = get_batcher(BASE_URL).execute_many([(query, None) for query in missing]) if missing else []
+                for query, result in zip(missing, results):
+                    cached[query] = store_reference(query, check_result(result))
+                for query, show in MENU_OPTIONS.values():
+                    if cached[query]:
+                        show(cached[query])
+
+            elif choice == '6':
+                print("👋 Closing AniList explorer. Sayonara!")
+                break
         
-        else:
-            print("⚠️ Invalid choice. Please pick 1-5.")
+            else:
+                print("⚠️ Invalid choice. Please pick 1-6.")
+        except http_client.OfflineError as error:
+            # --offline: only what the pantry already holds can be shown
+            print(f"📴 {error}")
 
 if __name__ == "__main__":
+    telemetry.configure()
+    http_client.configure_offline()
     explore_anilist()
\ No newline at end of file
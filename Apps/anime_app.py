@@ -1,35 +1,94 @@
+import startup  # first, so the startup clock includes every other import
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
-import requests
+import os
+import json
+import http_client
+from graphql_batch import get_batcher
 import webbrowser
-from PIL import Image, ImageTk
-from io import BytesIO
+from poster_cache import PosterCache
+from pager import paginate, MAX_PAGES
+from pantry import get_pantry, serve_stale, SEARCH_TTL
+from background import BackgroundFetcher, update_rows
+from autocomplete import Autocompleter
+from title_index import get_title_index, anilist_titles
+from watchlist import get_watchlist, SAVED_MARK
+from records import Anime, decode_anime, decode_anime_list, to_rows
+import telemetry
 
 # ==========================================
 # ⚙️ 1. ANILIST API CONFIG
 # ==========================================
 ANILIST_URL = 'https://graphql.anilist.co'
+PAGE_SIZE = 15
+DISCOVER_RESULTS = 30   # genre/year browsing pages until this many shows are listed
 
+# Two phases: the result list carries only what the rows and the title index
+# need; recommendations are fetched for the seed alone, and description /
+# cover only for the row that gets selected.
 SEARCH_QUERY = '''
-query ($search: String, $genre: String, $year: Int) {
-  Page(perPage: 15) {
+query AnimeSearchList ($search: String, $genre: String, $year: Int, $page: Int, $perPage: Int) {
+  Page(page: $page, perPage: $perPage) {
     media(search: $search, genre: $genre, seasonYear: $year, type: ANIME, sort: POPULARITY_DESC) {
       id
       title { romaji english }
-      genres
       averageScore
-      description
-      coverImage { large }
-      recommendations {
-        nodes {
-          mediaRecommendation {
-            id
-            title { romaji english }
-            genres
-            averageScore
-            description
-            coverImage { large }
-          }
+      seasonYear
+      popularity
+    }
+  }
+}
+'''
+
+# The first list hit (same filters and order) with the fields the scorer reads and its recommendations
+SEED_QUERY = '''
+query AnimeSeed ($search: String, $genre: String, $year: Int) {
+  Media(search: $search, genre: $genre, seasonYear: $year, type: ANIME, sort: POPULARITY_DESC) {
+    id
+    title { romaji english }
+    genres
+    averageScore
+    seasonYear
+    popularity
+    recommendations {
+      nodes {
+        mediaRecommendation {
+          id
+          title { romaji english }
+          genres
+          averageScore
+          seasonYear
+          popularity
+        }
+      }
+    }
+  }
+}
+'''
+
+DETAIL_QUERY = '''
+query AnimeDetail ($id: Int) {
+  Media(id: $id, type: ANIME) {
+    genres
+    description
+    coverImage { large }
+  }
+}
+'''
+
+# One show's recommendations, for crawling the recommendation graph past the first hop
+RECOMMENDATIONS_QUERY = '''
+query AnimeRecommendations ($id: Int) {
+  Media(id: $id, type: ANIME) {
+    recommendations {
+      nodes {
+        mediaRecommendation {
+          id
+          title { romaji english }
+          genres
+          averageScore
+          seasonYear
+          popularity
         }
       }
     }
@@ -37,6 +96,134 @@ query ($search: String, $genre: String, $year: Int) {
 }
 '''
 
+# One show by ID, or the best match for a title, with the fields the watchlist keeps
+MEDIA_QUERY = '''
+query AnimeLookup ($id: Int, $search: String, $year: Int) {
+  Media(id: $id, search: $search, seasonYear: $year, type: ANIME) {
+    id
+    title { romaji english }
+    seasonYear
+    averageScore
+    coverImage { large }
+  }
+}
+'''
+
+def check_anilist(result):
+    if result.get('errors'):
+        raise RuntimeError(result['errors'][0].get('message', 'AniList query failed'))
+    return result['data']
+
+def not_found(result):
+    """True if every error is AniList's "Not Found." (how a search with no match is answered)."""
+    errors = result.get('errors') or []
+    return bool(errors) and all("not found" in (error.get('message') or "").lower() for error in errors)
+
+def run_anilist(query, variables=None):
+    """Sends a query through the shared batcher (suggestions and searches issued together share a POST)."""
+    return check_anilist(get_batcher(ANILIST_URL).execute(query, variables))
+
+def recommendation_records(media):
+    nodes = ((media or {}).get('recommendations') or {}).get('nodes', [])
+    return [Anime.from_api(node['mediaRecommendation']) for node in nodes if node['mediaRecommendation']]
+
+def fetch_anime_recommendations(anime_id):
+    return recommendation_records(run_anilist(RECOMMENDATIONS_QUERY, {"id": anime_id})['Media'])
+
+def fetch_anime(anime_id):
+    return run_anilist(MEDIA_QUERY, {"id": anime_id})['Media']
+
+def find_anime(title, year=None):
+    """Best AniList match for a watchlist line, or None."""
+    try:
+        return run_anilist(MEDIA_QUERY, {"search": title, "year": int(year) if year else None})['Media']
+    except RuntimeError as error:
+        # "Not Found." comes back as a GraphQL error; anything else (rate limits, outages) is a failed lookup
+        if "not found" in str(error).lower():
+            return None
+        raise
+
+def fetch_search_page(variables, page):
+    page_vars = dict(variables, page=page, perPage=PAGE_SIZE)
+    cache_key = f"anilist:search:{json.dumps(page_vars, sort_keys=True)}"
+    return decode_anime_list(get_pantry().get_or_fetch(
+        cache_key, lambda: to_rows(decode_anime_list(run_anilist(SEARCH_QUERY, page_vars)['Page']['media'])),
+        ttl=SEARCH_TTL))
+
+def list_rows(result):
+    return to_rows(decode_anime_list(check_anilist(result)['Page']['media']))
+
+def seed_rows(result):
+    # Cached as [seed row, [recommendation rows]]; no match ("Not Found.", Media null) as [].
+    # Any other error (429, outage) raises, so nothing is cached and a stale seed is kept.
+    if result.get('errors') and not not_found(result):
+        check_anilist(result)
+    media = (result.get('data') or {}).get('Media')
+    return [Anime.from_api(media).to_row(), to_rows(recommendation_records(media))] if media else []
+
+def fetch_title_search(variables):
+    """(shows, seed, seed's recommendations) as Anime records for a title search; seed is None if nothing matched.
+
+    Whatever isn't cached is submitted together, so both travel in one merged POST.
+    Stale entries are answered from the pantry and refreshed in the background.
+    """
+    pantry = get_pantry()
+    page_vars = dict(variables, page=1, perPage=PAGE_SIZE)
+    list_key = f"anilist:search:{json.dumps(page_vars, sort_keys=True)}"
+    seed_key = f"anilist:seed:{json.dumps(variables, sort_keys=True)}"
+    (shows, list_stale), (seed, seed_stale) = pantry.lookup(list_key), pantry.lookup(seed_key)
+    if not isinstance(seed, list):
+        seed = None     # written by an older version; fetch it again
+    batcher = get_batcher(ANILIST_URL)
+    list_future = batcher.submit(SEARCH_QUERY, page_vars) if shows is None else None
+    seed_future = batcher.submit(SEED_QUERY, variables) if seed is None else None
+    if list_future:
+        shows = list_rows(list_future.result())
+        pantry.put(list_key, shows, ttl=SEARCH_TTL)
+    elif list_stale:
+        pantry.revalidate(list_key, lambda: list_rows(batcher.execute(SEARCH_QUERY, page_vars)), ttl=SEARCH_TTL)
+    if seed_future:
+        seed = seed_rows(seed_future.result())
+        if seed or shows:
+            pantry.put(seed_key, seed, ttl=SEARCH_TTL)
+    elif seed_stale:
+        pantry.revalidate(seed_key, lambda: seed_rows(batcher.execute(SEED_QUERY, variables)), ttl=SEARCH_TTL)
+    if not seed:
+        return decode_anime_list(shows), None, []
+    return decode_anime_list(shows), decode_anime(seed[0]), decode_anime_list(seed[1])
+
+def fetch_anime_detail(anime_id):
+    return get_pantry().get_or_fetch(f"anilist:detail:{anime_id}",
+                                     lambda: run_anilist(DETAIL_QUERY, {"id": anime_id})['Media'])
+
+def search_anime(anime_name, variables):
+    """One search (or genre/year browse) -> (shows, ranking by id), or None if nothing matched."""
+    if not anime_name:
+        data = list(paginate(lambda page: fetch_search_page(variables, page), want=DISCOVER_RESULTS,
+                             page_size=PAGE_SIZE, max_pages=MAX_PAGES))
+        if not data:
+            return None
+        get_title_index("anilist").add_many(anilist_titles(data))
+        return data, {}
+
+    # A title search only ever needs its first page
+    data, base_anime, recs = fetch_title_search(variables)
+    if not data:
+        return None
+    get_title_index("anilist").add_many(anilist_titles(data))
+    if recs:
+        # The NumPy-backed modules load on this worker the first time a title search needs them
+        from scoring import SimilarityScorer, ANILIST_FEATURES
+        from rec_graph import get_graph
+        get_graph().record("anilist", base_anime.id, recs)
+        get_title_index("anilist").add_many(anilist_titles(recs))
+        base_t = base_anime.title_lower
+        unique_recs = [r for r in recs if base_t not in r.title_lower]
+        # Rank by similarity to the base show, nudged toward the requested genre/year
+        ranked = SimilarityScorer(ANILIST_FEATURES).rank(base_anime, unique_recs, target_year=variables['year'], target_genre=variables['genre'])
+        return [r['item'] for r in ranked], {r['item'].id: r for r in ranked}
+    return data, {}
+
 class AnimeEngineGUI:
     def __init__(self, root):
         self.root = root
@@ -45,7 +232,16 @@ class AnimeEngineGUI:
         self.root.configure(bg="#0b1622") 
         
         self.current_results = []
-        self.base_genres = []
+        self.ranking = {}    # anime id -> scored entry from the similarity ranking
+        self.fetcher = BackgroundFetcher(root)
+        self.posters = PosterCache()
+        self.autocomplete = Autocompleter(root, self.fetcher, self.fetch_suggestions, self.show_suggestions,
+                                          on_clear=lambda: self.suggestion_menu.unpost(),
+                                          local=self.local_suggestions)
+        # The local title index loads on a worker so a large one doesn't hold up the window
+        self.titles = None
+        self.fetcher.submit("titles", get_title_index, "anilist", on_done=lambda index: setattr(self, 'titles', index))
+        self.watchlist = get_watchlist()
 
         # ==========================================
         # 🏗️ 2. THE PANED WINDOW (DRAGGABLE DIVIDER)
@@ -128,104 +324,203 @@ class AnimeEngineGUI:
         setattr(self, var_name, entry)
 
     def on_type_suggestion(self, *args):
-        text = self.anime_text_var.get()
-        if len(text) < 3:
-            self.suggestion_menu.unpost()
-            return
-        query = 'query ($s: String) { Page(perPage: 5) { media(search: $s, type: ANIME) { title { english romaji } } } }'
-        try:
-            response = requests.post(ANILIST_URL, json={'query': query, 'variables': {'s': text}})
-            results = response.json()['data']['Page']['media']
-            if results:
-                self.suggestion_menu.delete(0, tk.END)
-                for item in results:
-                    name = item['title']['english'] if item['title']['english'] else item['title']['romaji']
-                    self.suggestion_menu.add_command(label=name, command=lambda n=name: self.select_suggestion(n))
-                x = self.entry_anime.winfo_rootx()
-                y = self.entry_anime.winfo_rooty() + self.entry_anime.winfo_height()
-                self.suggestion_menu.post(x, y)
-        except: pass
+        # Debounced + cached; lookup failures are ignored since suggestions are a nice-to-have
+        self.autocomplete.on_text(self.anime_text_var.get())
+
+    def local_suggestions(self, text, limit):
+        return self.titles.suggest(text, limit) if self.titles else []
+
+    def fetch_suggestions(self, text):
+        query = 'query ($s: String) { Page(perPage: 15) { media(search: $s, type: ANIME) { title { english romaji } popularity } } }'
+        results = run_anilist(query, {'s': text})['Page']['media']
+        get_title_index("anilist").add_many(anilist_titles(results))
+        return [item['title']['english'] if item['title']['english'] else item['title']['romaji'] for item in results]
+
+    def show_suggestions(self, names):
+        if not names: return
+        self.suggestion_menu.delete(0, tk.END)
+        for name in names:
+            self.suggestion_menu.add_command(label=name, command=lambda n=name: self.select_suggestion(n))
+        x = self.entry_anime.winfo_rootx()
+        y = self.entry_anime.winfo_rooty() + self.entry_anime.winfo_height()
+        self.suggestion_menu.post(x, y)
 
     def select_suggestion(self, name):
         self.anime_text_var.set(name)
+        self.autocomplete.cancel()
         self.suggestion_menu.unpost()
 
+    # fetch_* methods run on worker threads and must not touch widgets;
+    # show_* methods are their callbacks on the Tk loop.
     def perform_search(self):
         anime_name = self.entry_anime.get()
         year_val = self.entry_year.get()
         genre_val = self.entry_genre.get().capitalize()
         variables = {"search": anime_name if anime_name else None, "genre": genre_val if genre_val else None, 
                      "year": int(year_val) if year_val and year_val.isdigit() else None}
-        try:
-            response = requests.post(ANILIST_URL, json={'query': SEARCH_QUERY, 'variables': variables})
-            data = response.json()['data']['Page']['media']
-            if not data:
-                messagebox.showwarning("No Results", "No anime found.")
-                return
-            if anime_name and data[0]['recommendations']['nodes']:
-                base_anime = data[0]
-                self.base_genres = base_anime['genres']
-                raw_recs = [node['mediaRecommendation'] for node in base_anime['recommendations']['nodes'] if node['mediaRecommendation']]
-                base_t = (base_anime['title']['english'] or base_anime['title']['romaji']).lower()
-                self.current_results = [r for r in raw_recs if base_t not in (r['title']['english'] or "").lower()]
-            else:
-                self.current_results = data
-                self.base_genres = []
-            self.results_list.delete(0, tk.END)
-            for anime in self.current_results:
-                display_name = anime['title']['english'] if anime['title']['english'] else anime['title']['romaji']
-                self.results_list.insert(tk.END, f" {display_name}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed: {e}")
 
+        self.fetcher.cancel("detail")
+        self.fetcher.cancel("refresh")
+        self.current_results = []
+        self.results_list.delete(0, tk.END)
+        self.results_list.insert(tk.END, " Searching AniList...")
+        self.fetcher.submit("search", serve_stale, self.fetch_results, anime_name, variables,
+                            on_done=self.show_served, on_error=self.show_search_error)
+
+    def fetch_results(self, anime_name, variables):
+        return search_anime(anime_name, variables)
+
+    def show_served(self, served):
+        # Cached results show at once; if some were stale, the refreshed ones follow
+        payload, refresh = served
+        self.show_results(payload)
+        if refresh:
+            self.fetcher.submit("refresh", refresh, on_done=self.refresh_results)
+
+    def show_results(self, payload):
+        self.results_list.delete(0, tk.END)
+        if payload is None:
+            messagebox.showwarning("No Results", "No anime found.")
+            return
+        self.current_results, self.ranking = payload
+        for anime in self.current_results:
+            self.results_list.insert(tk.END, self.result_label(anime))
+
+    def refresh_results(self, payload):
+        """Fresh data for the listed search: only changed rows are redrawn and the selected show stays selected."""
+        if payload is None:
+            return
+        selected = [self.current_results[i].id for i in self.results_list.curselection()
+                    if i < len(self.current_results)]
+        self.current_results, self.ranking = payload
+        update_rows(self.results_list, [self.result_label(anime) for anime in self.current_results])
+        for row, anime in enumerate(self.current_results):
+            if anime.id in selected:
+                self.results_list.selection_set(row)
+
+    def result_label(self, anime):
+        saved = f" {SAVED_MARK}" if self.watchlist.contains("anilist", anime.id) else ""
+        return f" {anime.display_title}{saved}"
+
+    def show_search_error(self, error):
+        self.results_list.delete(0, tk.END)
+        messagebox.showerror("Error", f"Failed: {error}")
+
+    @telemetry.traced("ui_select")
     def on_select_anime(self, event):
         if not self.results_list.curselection(): return
         index = self.results_list.curselection()[0]
+        if index >= len(self.current_results): return
         anime = self.current_results[index]
 
         self.detail_area.delete('1.0', tk.END)
         for widget in self.action_frame.winfo_children(): widget.destroy()
+        self.fetcher.cancel("detail")
 
-        if anime.get('coverImage'):
-            resp = requests.get(anime['coverImage']['large'])
-            img_data = Image.open(BytesIO(resp.content))
-            photo = ImageTk.PhotoImage(img_data)
-            self.poster_label.config(image=photo)
-            self.poster_label.image = photo
-
-        matched = [g for g in anime['genres'] if g in self.base_genres]
-        reason_text = f"💡 REASON: Both are {', '.join(matched)}\n\n" if matched else ""
+        entry = self.ranking.get(anime.id)
+        if entry:
+            from scoring import explain  # already loaded by the search that produced `entry`
+        reason_text = f"💡 REASON: {explain(entry)}\n\n" if entry else ""
         
-        eng, rom = anime['title']['english'], anime['title']['romaji']
+        eng, rom = anime.english, anime.romaji
         full_title = f"{eng}\n({rom})" if eng and rom and eng.lower() != rom.lower() else (eng if eng else rom)
-        desc = anime.get('description', '').replace('<br>', '\n').replace('<i>', '').replace('</i>', '')
 
         self.detail_area.insert(tk.END, f"{full_title.upper()}\n", "title")
         self.detail_area.insert(tk.END, reason_text, "reason")
         self.detail_area.insert(tk.END, f"⭐ Rating: {anime.get('averageScore', '??')}/100\n\n")
-        self.detail_area.insert(tk.END, desc)
+        self.detail_area.mark_set("description", tk.END)
+        self.detail_area.mark_gravity("description", tk.LEFT)
         
         self.detail_area.tag_config("title", font=("Arial", 20, "bold"), foreground="#3db4f2")
         self.detail_area.tag_config("reason", font=("Arial", 11, "italic"), foreground="#FFD700")
 
+        # Result rows only carry titles and scores; description and cover are fetched for the row picked
+        if anime.description is not None:
+            self.show_anime_detail(anime, {})
+        else:
+            self.detail_area.insert(tk.END, "Loading details...")
+            self.poster_label.config(image="", text="", fg="#9fadbd")
+            self.poster_label.image = None
+            self.fetcher.submit("detail", fetch_anime_detail, anime.id,
+                                on_done=lambda detail: self.show_anime_detail(anime, detail),
+                                on_error=self.show_detail_error)
+
         tk.Button(self.action_frame, text="VIEW ON ANILIST", bg="#189ae0", fg="white", font=("Arial", 10, "bold"),
-                  command=lambda: webbrowser.open(f"https://anilist.co/anime/{anime['id']}")).pack(side="left", padx=10, expand=True)
+                  command=lambda: webbrowser.open(f"https://anilist.co/anime/{anime.id}")).pack(side="left", padx=10, expand=True)
         
         tk.Button(self.action_frame, text="SAVE TO MY LIST", bg="#FFD700", fg="#0b1622", font=("Arial", 10, "bold"),
                   command=lambda: self.save_to_file(anime)).pack(side="left", padx=10, expand=True)
 
+    def show_anime_detail(self, anime, detail):
+        anime.update(detail)    # a second click on this row (or saving it) needs no request
+        desc = (anime.description or '').replace('<br>', '\n').replace('<i>', '').replace('</i>', '')
+        self.detail_area.delete("description", tk.END)
+        self.detail_area.insert(tk.END, desc)
+
+        # Cover: a memory-cache hit shows instantly, otherwise a placeholder until the worker decodes it
+        cover_key = (anime.cover, self.poster_box()) if anime.cover else None
+        photo = self.posters.get_photo(cover_key) if cover_key else None
+        if photo:
+            self.poster_label.config(image=photo, text="")
+        elif cover_key:
+            self.poster_label.config(image="", text="Loading cover...", fg="#9fadbd")
+            self.fetcher.submit("detail", self.fetch_cover, cover_key,
+                                on_done=self.show_cover, on_error=self.show_cover_error)
+        else:
+            self.poster_label.config(image="", text="")
+        self.poster_label.image = photo
+
+    def show_detail_error(self, error):
+        self.detail_area.delete("description", tk.END)
+        self.detail_area.insert(tk.END, f"Details unavailable: {error}")
+
+    def poster_box(self):
+        # Same proportions as the movie engine; AniList "large" covers are smaller and never upscaled
+        height = max(self.right_frame.winfo_height() * 53 // 100, 231)
+        return (height * 2 // 3, height)
+
+    def fetch_cover(self, cover_key):
+        url, box = cover_key
+        return cover_key, self.posters.load_image(url, box)
+
+    def show_cover(self, payload):
+        cover_key, img_data = payload
+        photo = self.posters.put_photo(cover_key, img_data)
+        self.poster_label.config(image=photo, text="")
+        self.poster_label.image = photo
+
+    def show_cover_error(self, error):
+        self.poster_label.config(text="Cover unavailable")
+
+    def import_watchlist(self):
+        # Lines still in the old anime_watchlist.txt are matched to AniList IDs once, in the background
+        self.fetcher.submit("watchlist", self.watchlist.import_text, "anilist", find_anime)
+
     def save_to_file(self, anime):
-        name = anime['title']['english'] if anime['title']['english'] else anime['title']['romaji']
-        with open("anime_watchlist.txt", "a", encoding="utf-8") as f:
-            f.write(f"{name}\n")
+        name = anime.display_title
+        if not self.watchlist.add("anilist", anime):
+            messagebox.showinfo("Saved!", f"'{name}' is already on your list.")
+            return
+        # Mark the row in place (by ID: a background refresh may have swapped in new records)
+        rows = [a.id for a in self.current_results]
+        if anime.id in rows:
+            row = rows.index(anime.id)
+            self.results_list.delete(row)
+            self.results_list.insert(row, self.result_label(anime))
         messagebox.showinfo("Saved!", f"'{name}' added!")
 
 def main():
+    telemetry.configure()
+    http_client.configure_offline()
     root = tk.Tk()
     app = AnimeEngineGUI(root)
+    telemetry.watch_tk(root)
+    # The watchlist import makes requests, so it waits until the window is up
+    startup.window_ready(root, app.fetcher, ("scoring", "rec_graph"), deferred=(app.import_watchlist,))
     root.mainloop()
+    # Set AUTOCOMPLETE_STATS=1 to print cache hit rates when tuning the debounce window
+    if os.getenv('AUTOCOMPLETE_STATS'):
+        print(f"⌨️ Autocomplete stats: {app.autocomplete.stats()}")
 
 if __name__ == "__main__":
-    import hupper
-    reloader = hupper.start_reloader('anime_app.main') 
-    main()
\ No newline at end of file
+    startup.launch("anime_app", main)
\ No newline at end of file
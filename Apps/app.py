@@ -1,17 +1,27 @@
 import os
 import json
-import requests
+import http_client
 import textwrap
 import random
 import webbrowser
 from dotenv import load_dotenv
+from pantry import get_pantry, SEARCH_TTL
+from query_planner import QueryPlan
+import movie_details
+from pager import paginate, tmdb_page_fetcher, TMDB_PAGE_SIZE, MAX_PAGES
+from catalog_index import local_first
+from scoring import SimilarityScorer, TMDB_FEATURES, explain
+from rec_graph import get_graph, start_background_crawl
+from title_index import get_title_index, tmdb_titles
+from watchlist import get_watchlist, SAVED_MARK
+from records import Movie, decode_movies
+import telemetry
 
 # 1. SETUP & CONFIGURATION
 load_dotenv()
 API_TOKEN = os.getenv('TMDB_TOKEN')
 BASE_URL = os.getenv('BASE_URL')
 headers = {"accept": "application/json", "Authorization": f"Bearer {API_TOKEN}"}
-CACHE_FILE = "tmdb_pantry.json"
 
 # --- THE MISSING VARIABLE ---
 GENRES = {
@@ -23,96 +33,209 @@ GENRES = {
 # Create a dictionary that turns 28 -> "Action", etc.
 GENRE_NAMES = {v: k.capitalize() for k, v in GENRES.items()}
 
+detail_loader = movie_details.DetailLoader(BASE_URL, headers)
+movie_scorer = SimilarityScorer(TMDB_FEATURES)
+
+# How many filter-passing recommendations to page for before giving up on deeper pages
+FILTER_QUOTA = 10
+SURPRISE_POOL = 60
+# Movies the background crawler may fetch per multi-movie query to deepen the graph
+GRAPH_CRAWL = 100
+
 # 2. CACHING ENGINE
-def get_recommendations_with_cache(movie_id):
-    pantry = {}
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as f:
-            pantry = json.load(f)
-            if str(movie_id) in pantry:
-                return pantry[str(movie_id)]
-    
-    rec_url = f"{BASE_URL}/movie/{movie_id}/recommendations"
-    response = requests.get(rec_url, headers=headers)
-    data = response.json().get('results', [])
-    
-    pantry[str(movie_id)] = data
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(pantry, f)
-    return data
+def get_recommendations_with_cache(movie_id, keep=None, want=None, max_pages=1, record=True):
+    """Recommendations for `movie_id`, one pantry entry per page. Pages past the first are
+    only fetched while fewer than `want` results pass `keep`. Raises if TMDB fails, so a
+    movie is only added to the graph with the edges it really has."""
+    fetch_page = tmdb_page_fetcher(f"{BASE_URL}/movie/{movie_id}/recommendations", headers,
+                                   cache_key=f"tmdb:recs:{movie_id}", ttl=None)
+    recommendations = list(paginate(fetch_page, keep=keep, want=want, max_pages=max_pages))
+    if record:
+        get_graph().record("tmdb", movie_id, recommendations)
+    return recommendations
 
-def add_to_watchlist(movie_details):
-    with open("watchlist.txt", "a", encoding="utf-8") as f:
-        f.write(f"{movie_details}\n")
-    print("\n✅ Saved to watchlist.txt!")
+def crawl_recommendations(movie_id):
+    # The crawler records each node itself, once the fetch succeeded
+    return get_recommendations_with_cache(movie_id, record=False)
 
-# 3. MAIN INTERFACE
-def main():
-    print("\n🎬 WELCOME TO THE MOVIE DISCOVERY ENGINE")
-    print("-" * 40)
-    fav_movie = input("Base Movie (leave blank for discovery): ")
-    year_filter = input("Year (optional): ")
-    theme_input = input("Genre or Keyword (e.g. 'Space' or 'Thriller'): ").lower()
-    actor_name = input("Actor/Actress (optional): ")
-    
-    mode = input("\nChoose Mode: [1] List Top 5 | [2] Surprise Me (Random): ")
+def matches_filters(movie, year_filter, genre_id):
+    return ((not year_filter or (movie.release_date and year_filter in movie.release_date)) and
+            (not genre_id or genre_id in movie.genre_ids))
+
+def fetch_recommendations(base_movie, year_filter, genre_id):
+    # With filters set, keep paging until enough non-sequel matches turn up
+    if not (year_filter or genre_id):
+        return get_recommendations_with_cache(base_movie.id)
+    base_title = base_movie.title_lower
+    return get_recommendations_with_cache(
+        base_movie.id, want=FILTER_QUOTA, max_pages=MAX_PAGES,
+        keep=lambda m: base_title not in m.title_lower and matches_filters(m, year_filter, genre_id))
+
+def graph_recommendations(seeds, want=SURPRISE_POOL):
+    """Multi-hop recommendations for several base movies (personalized PageRank over the stored graph)."""
+    graph = get_graph()
+    seed_ids = [m.id for m in seeds]
+    # Unseen seeds get their first hop now; deeper hops come from the crawler for next time
+    for movie_id in seed_ids:
+        if not graph.is_crawled("tmdb", movie_id):
+            get_recommendations_with_cache(movie_id)
+    if GRAPH_CRAWL:
+        start_background_crawl(graph, "tmdb", seed_ids, crawl_recommendations, max_nodes=GRAPH_CRAWL)
+    return graph.recommend("tmdb", seed_ids, count=want)
+
+def search_movie_list(query, year=None):
+    """All /search/movie hits for `query` (first page) as Movie records, cached like the GUI's searches."""
+    params = {"query": query, "primary_release_year": year or None}
+    cache_key = f"tmdb:search:{query.lower()}" + (f":{year}" if year else "")
+    def fetch():
+        response = http_client.get(f"{BASE_URL}/search/movie", headers=headers, params=params)
+        response.raise_for_status()     # a TMDB failure is an error, not zero hits
+        return {"results": [Movie.from_api(raw).to_row() for raw in response.json().get('results', [])]}
+
+    res = get_pantry().get_or_fetch(cache_key, fetch, ttl=SEARCH_TTL)
+    movies = decode_movies(res.get('results'))
+    get_title_index("tmdb").add_many(tmdb_titles(movies))
+    return movies
+
+def search_first(kind, query):
+    """First hit of /search/{kind} for `query` (a Movie record for kind="movie"), or None."""
+    if kind == "movie":
+        movies = search_movie_list(query)
+        return movies[0] if movies else None
+    def fetch():
+        response = http_client.get(f"{BASE_URL}/search/{kind}", headers=headers, params={"query": query})
+        response.raise_for_status()
+        return response.json().get('results', [])[:1]
+
+    hits = get_pantry().get_or_fetch(f"tmdb:search-{kind}:{query.lower()}", fetch, ttl=SEARCH_TTL)
+    return hits[0] if hits else None
+
+def first_result_id(kind, query):
+    hit = search_first(kind, query)
+    return hit['id'] if hit else None
+
+def discover_movies(year_filter, actor_id, genre_id, keyword_id, want=TMDB_PAGE_SIZE):
+    params = {"primary_release_year": year_filter, "with_cast": actor_id, 
+              "with_genres": genre_id, "with_keywords": keyword_id, "sort_by": "popularity.desc"}
+    # The offline catalog (if one was ingested) answers first; TMDB only on a miss
+    fetch_page = local_first(tmdb_page_fetcher(f"{BASE_URL}/discover/movie", headers, params,
+                                               cache_key=f"tmdb:discover-list:{json.dumps(params, sort_keys=True)}"),
+                             params)
+    return list(paginate(fetch_page, want=want, max_pages=MAX_PAGES))
+
+def find_movie(title, year=None):
+    """Best /search/movie match for a watchlist line, or None."""
+    response = http_client.get(f"{BASE_URL}/search/movie", headers=headers,
+                               params={"query": title, "primary_release_year": year})
+    response.raise_for_status()     # a failed lookup must not look like "no match"
+    res = response.json()
+    return res['results'][0] if res.get('results') else None
 
-# --- ID SCOUTING ---
-    target_actor_id = None
+def fetch_movie(movie_id):
+    response = http_client.get(f"{BASE_URL}/movie/{movie_id}", headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+def add_to_watchlist(movie):
+    if get_watchlist().add("tmdb", movie):
+        print("\n✅ Saved to your watchlist!")
+    else:
+        print("\n☑️ Already in your watchlist.")
+
+# 3. SEARCH & RANKING (shared by the prompt below and batch.py)
+def search_movies(fav_movie, year_filter="", theme_input="", actor_name="", discover_want=TMDB_PAGE_SIZE):
+    """Runs the lookup plan for one query; returns (plan, stage results)."""
+    # --- ID SCOUTING (planned: independent lookups run concurrently) ---
     target_genre_id = GENRES.get(theme_input)
-    target_keyword_id = None
 
-    if actor_name:
-        p_res = requests.get(f"{BASE_URL}/search/person", headers=headers, params={"query": actor_name}).json()
-        if p_res.get('results'): 
-            target_actor_id = p_res['results'][0]['id']
+    plan = QueryPlan()
+    plan.add("actor", lambda: first_result_id("person", actor_name) if actor_name else None)
+    plan.add("keyword", lambda: first_result_id("keyword", theme_input) if theme_input and not target_genre_id else None)
+    fav_titles = [t.strip() for t in fav_movie.split("+") if t.strip()]
+    seed_stages = [f"seed_{i}" for i in range(len(fav_titles))]
+    for stage, title in zip(seed_stages, fav_titles):
+        plan.add(stage, lambda title=title: search_first("movie", title))
+    plan.add("base_movie", lambda *seeds: next((s for s in seeds if s), None), deps=seed_stages)
+    plan.add("seeds", lambda *seeds: [s for s in seeds if s], deps=seed_stages)
+    # Several base movies are answered from the recommendation graph instead of one hop
+    plan.add("recommendations", lambda seeds: (graph_recommendations(seeds) if len(seeds) > 1 else
+                                               fetch_recommendations(seeds[0], year_filter, target_genre_id) if seeds else []),
+             deps=["seeds"])
+    plan.add("discover", lambda actor_id, keyword_id: discover_movies(year_filter, actor_id, target_genre_id, keyword_id,
+                                                                      want=discover_want),
+             deps=["actor", "keyword"])
 
-    if theme_input and not target_genre_id:
-        k_res = requests.get(f"{BASE_URL}/search/keyword", headers=headers, params={"query": theme_input}).json()
-        if k_res.get('results'): 
-            target_keyword_id = k_res['results'][0]['id']
+    # Only the stages the chosen path needs are run (a base movie ignores actor/keyword)
+    found = plan.run("recommendations", "base_movie") if fav_movie else plan.run("discover")
+    return plan, found
 
-# --- CORE SEARCH (All Improvements Combined) ---
+def rank_movies(found, fav_movie, year_filter="", theme_input=""):
+    """Orders what search_movies found; returns (movies, ranking by id, headline or None)."""
+    # --- CORE SEARCH (All Improvements Combined) ---
+    target_genre_id = GENRES.get(theme_input)
     movies_to_show = []
-    base_genre_ids = [] # Used to explain the "Why" later
-    
+    ranking = {} # movie id -> scored entry, used to explain the "Why" later
+    headline = None
+
     if fav_movie:
-        s_res = requests.get(f"{BASE_URL}/search/movie", headers=headers, params={"query": fav_movie}).json()
-        if s_res.get('results'):
-            base_movie = s_res['results'][0]
-            base_id = base_movie['id']
-            base_title = base_movie['title'].lower()
-            base_genre_ids = base_movie.get('genre_ids', []) # Save the DNA
+        base_movie = found["base_movie"]
+        if base_movie:
+            base_title = base_movie.title_lower
             
-            recommendations = get_recommendations_with_cache(base_id)
+            recommendations = found["recommendations"]
+            seeds = found["seeds"]
             
-            # IMPROVEMENT 1: Filter out sequels immediately
-            unique_recs = [m for m in recommendations if base_title not in m['title'].lower()]
-            
-            # IMPROVEMENT 2: Tiered Fallback Logic (Perfect -> Close -> Broad)
-            # Tier 1: Matches Year AND Genre
-            tier_1 = [m for m in unique_recs if 
-                     (not year_filter or (m.get('release_date') and year_filter in m['release_date'])) and
-                     (not target_genre_id or target_genre_id in m.get('genre_ids', []))]
-            
-            # Tier 2: Matches Genre only
-            tier_2 = [m for m in unique_recs if (not target_genre_id or target_genre_id in m.get('genre_ids', []))]
-
-            if tier_1:
-                movies_to_show = tier_1
-                print("\n✨ Found perfect matches!")
-            elif tier_2 and (year_filter or target_genre_id):
-                movies_to_show = tier_2
-                print(f"\n⚠️ No {year_filter} matches. Showing {theme_input or 'relevant'} recommendations...")
+            if len(seeds) > 1:
+                # Graph order already blends every seed; the per-seed similarity score wouldn't
+                seed_titles = [s.title_lower for s in seeds]
+                movies_to_show = [m for m in recommendations
+                                  if not any(t in m.title_lower for t in seed_titles)]
+                headline = f"✨ Ranked by the recommendation graph around {' + '.join(s.title for s in seeds)}."
             else:
-                movies_to_show = unique_recs
-                print("\nℹ️ No matches for those filters. Showing all top recommendations...")
+                # IMPROVEMENT 1: Filter out sequels immediately
+                unique_recs = [m for m in recommendations if base_title not in m.title_lower]
+                
+                # IMPROVEMENT 2: Similarity ranking (shared genres, your genre, era, rating, popularity)
+                # Filters are soft: exact matches score highest, near misses still make the list
+                ranked = movie_scorer.rank(base_movie, unique_recs, target_genre=target_genre_id,
+                                           target_year=year_filter if year_filter.isdigit() else None)
+                ranking = {r['item'].id: r for r in ranked}
+                movies_to_show = [r['item'] for r in ranked]
+
+                perfect = sum(1 for m in unique_recs if matches_filters(m, year_filter, target_genre_id))
+                if perfect and (year_filter or target_genre_id):
+                    headline = f"✨ Found {perfect} perfect matches! Ranked by similarity to {base_movie.title}."
+                elif year_filter or target_genre_id:
+                    headline = f"⚠️ No exact {year_filter} {theme_input} matches. Showing the closest recommendations..."
+                else:
+                    headline = f"✨ Ranked by similarity to {base_movie.title}."
     else:
         # Standard Discovery Path
-        params = {"primary_release_year": year_filter, "with_cast": target_actor_id, 
-                  "with_genres": target_genre_id, "with_keywords": target_keyword_id, "sort_by": "popularity.desc"}
-        res = requests.get(f"{BASE_URL}/discover/movie", headers=headers, params=params).json()
-        movies_to_show = res.get('results', [])
+        movies_to_show = found["discover"]
+    return movies_to_show, ranking, headline
+
+# 4. MAIN INTERFACE
+def main():
+    telemetry.configure()
+    http_client.configure_offline()
+    print("\n🎬 WELCOME TO THE MOVIE DISCOVERY ENGINE")
+    print("-" * 40)
+    fav_movie = input("Base Movie (leave blank for discovery, join several with '+'): ")
+    year_filter = input("Year (optional): ")
+    theme_input = input("Genre or Keyword (e.g. 'Space' or 'Thriller'): ").lower()
+    actor_name = input("Actor/Actress (optional): ")
+    
+    mode = input("\nChoose Mode: [1] List Top 5 | [2] Surprise Me (Random): ")
+
+    # Surprise Me draws from a deeper pool than the first page
+    plan, found = search_movies(fav_movie, year_filter, theme_input, actor_name,
+                                discover_want=SURPRISE_POOL if mode == '2' else TMDB_PAGE_SIZE)
+    if os.getenv('QUERY_TIMINGS'):
+        print(f"\n⏱️ QUERY TIMINGS\n{plan.report()}")
+
+    movies_to_show, ranking, headline = rank_movies(found, fav_movie, year_filter, theme_input)
+    if headline:
+        print(f"\n{headline}")
 
 # --- RANDOMIZER LOGIC ---
     if mode == '2':
@@ -128,16 +251,22 @@ def main():
         print("\n❌ No matches found.")
         return
 
-    print(f"\n{'='*75}\n{'ID':<4} {'MOVIE TITLE':<40} {'YEAR':<6} {'RATING':<8}\n{'='*75}")
+    print(f"\n{'='*75}\n{'ID':<4} {'MOVIE TITLE':<40} {'YEAR':<6} {'RATING':<8} {'MATCH':<6}\n{'='*75}")
+    watchlist = get_watchlist()
     
     # We store the objects in a list so we can access them by index later
     session_movies = movies_to_show[:5] if mode != '2' else [movies_to_show[0]]
 
+    # Start loading details for every listed movie while the user reads the list
+    detail_loader.prefetch([m.id for m in session_movies])
+
     for i, movie in enumerate(session_movies, 1):
-        title = movie['title']
+        title = movie.title
         year = movie.get('release_date', '????')[:4]
-        rating = f"{movie['vote_average']}/10"
-        print(f"[{i}]  {title[:38]:<40} {year:<6} {rating:<8}")
+        rating = f"{movie.vote_average}/10"
+        match = f"{ranking[movie.id]['score'] * 100:.0f}%" if movie.id in ranking else "-"
+        saved = f" {SAVED_MARK}" if watchlist.contains("tmdb", movie.id) else ""
+        print(f"[{i}]  {title[:38]:<40} {year:<6} {rating:<8} {match:<6}{saved}")
 
     # --- INTERACTION MENU (Now with REASON logic) ---
     while True:
@@ -149,24 +278,23 @@ def main():
         if choice.isdigit() and 1 <= int(choice) <= len(session_movies):
             selected = session_movies[int(choice)-1]
             
-            print(f"\n--- LOADING DETAILS FOR: {selected['title']} ---")
+            print(f"\n--- LOADING DETAILS FOR: {selected.title} ---")
             
-            # 1. Fetch Cast & Trailer (Same as before)
-            c_res = requests.get(f"{BASE_URL}/movie/{selected['id']}/credits", headers=headers).json()
-            cast = ", ".join([p['name'] for p in c_res.get('cast', [])[:3]])
-            v_res = requests.get(f"{BASE_URL}/movie/{selected['id']}/videos", headers=headers).json()
-            trailer_key = next((v['key'] for v in v_res.get('results', []) if v['type'] == 'Trailer'), None)
+            # 1. Fetch Cast & Trailer (one append_to_response call, usually already prefetched)
+            details = detail_loader.get(selected.id)
+            cast = ", ".join(movie_details.top_cast(details))
+            trailer_key = movie_details.trailer_key(details)
 
             # 2. GENERATE THE REASON (The "Why")
-            # We look for overlapping Genre IDs between the Base Movie and the Recommendation
-            matched_genres = [GENRE_NAMES[g_id] for g_id in selected.get('genre_ids', []) if g_id in base_genre_ids]
+            # The scorer's per-feature breakdown: shared genres, year gap, strongest signal
+            reason = explain(ranking[selected.id]) if selected.id in ranking else None
 
             # 3. Detailed Display
-            print(f"\n🎬 {selected['title'].upper()} ({selected.get('release_date', '????')[:4]})")
+            print(f"\n🎬 {selected.title.upper()} ({selected.get('release_date', '????')[:4]})")
             
-            if fav_movie and matched_genres:
+            if fav_movie and reason:
                 # This only shows if you started with a "Base Movie"
-                print(f"💡 REASON: Both movies are {', '.join(matched_genres)}")
+                print(f"💡 REASON: {reason}")
             elif not fav_movie:
                 print(f"💡 REASON: Matches your {theme_input} filters")
             
@@ -178,8 +306,10 @@ def main():
                 if input("\n▶️ Watch trailer? (y/n): ").lower() == 'y':
                     webbrowser.open(f"https://www.youtube.com/watch?v={trailer_key}")
             
-            if input("💾 Add to watchlist? (y/n): ").lower() == 'y':
-                add_to_watchlist(f"{selected['title']} ({selected.get('release_date')[:4]})")
+            if watchlist.contains("tmdb", selected.id):
+                print(f"{SAVED_MARK} Already in your watchlist.")
+            elif input("💾 Add to watchlist? (y/n): ").lower() == 'y':
+                add_to_watchlist(selected)
             
             print("\n" + "-"*40)
             print("Returning to list...")
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+
+import rate_limit
+
+# ==========================================
+# ⌨️ DEBOUNCED AUTOCOMPLETE
+# ==========================================
+# Typing a title used to fire one blocking search per keystroke. The
+# Autocompleter waits until the user pauses (debounce), answers from an
+# in-memory cache when it can, and only then asks the network through the
+# shared BackgroundFetcher (whose channel drops superseded lookups).
+#
+# Prefix reuse: the results cached for "ince" already contain every title
+# that will match "incep", so when filtering them locally still leaves a
+# full list of suggestions no request is sent.
+#
+# Local index: an optional `local(query, limit)` (the on-disk title index)
+# is asked next, on the Tk thread; the network only runs when it returns
+# fewer than `limit` titles.
+class Autocompleter:
+    def __init__(self, root, fetcher, lookup, on_results, on_clear,
+                 debounce_ms=250, min_chars=3, limit=5, max_entries=256, channel="suggest", local=None):
+        self.root = root
+        self.fetcher = fetcher
+        self.lookup = lookup            # runs on a worker: query -> list of titles
+        self.on_results = on_results    # runs on the Tk loop with up to `limit` titles
+        self.on_clear = on_clear
+        self.local = local              # runs on the Tk loop: (query, limit) -> titles, must be fast
+        self.debounce_ms = debounce_ms
+        self.min_chars = min_chars
+        self.limit = limit
+        self.max_entries = max_entries
+        self.channel = channel
+
+        self._cache = OrderedDict()     # normalized query -> titles, in LRU order
+        self._pending = None
+        self.counters = {"keystrokes": 0, "debounced": 0, "lookups": 0,
+                         "exact_hits": 0, "prefix_hits": 0, "local_hits": 0, "misses": 0}
+
+    def on_text(self, text):
+        self.counters["keystrokes"] += 1
+        if self._pending:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+            self.counters["debounced"] += 1
+
+        query = text.strip().lower()
+        if len(query) < self.min_chars:
+            self.fetcher.cancel(self.channel)
+            self.on_clear()
+            return
+        self._pending = self.root.after(self.debounce_ms, self._fire, query)
+
+    def cancel(self):
+        """Forgets the pending keystroke and any lookup in flight (e.g. after a suggestion is picked)."""
+        if self._pending:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+        self.fetcher.cancel(self.channel)
+
+    def _fire(self, query):
+        self._pending = None
+        self.counters["lookups"] += 1
+
+        titles = self._cache.get(query)
+        if titles is not None:
+            self._cache.move_to_end(query)
+            self.counters["exact_hits"] += 1
+        else:
+            titles = self._from_prefix(query)
+            if titles is not None:
+                self.counters["prefix_hits"] += 1
+        if titles is None and self.local:
+            titles = self.local(query, self.limit)
+            if len(titles) >= self.limit:
+                self.counters["local_hits"] += 1
+            else:
+                titles = None
+
+        if titles is not None:
+            self.fetcher.cancel(self.channel)
+            self.on_results(titles[:self.limit])
+            return
+
+        self.counters["misses"] += 1
+        self.fetcher.submit(self.channel, self._background_lookup, query,
+                            on_done=lambda found: self._store(query, found))
+
+    def _background_lookup(self, query):
+        # Suggestions yield to searches and detail loads under the rate limiter
+        with rate_limit.background():
+            return self.lookup(query)
+
+    def _from_prefix(self, query):
+        # Only the longest cached prefix is consulted: shorter ones hold the same
+        # matches at best, since search results are capped at one page.
+        for end in range(len(query) - 1, self.min_chars - 1, -1):
+            titles = self._cache.get(query[:end])
+            if titles is None:
+                continue
+            self._cache.move_to_end(query[:end])
+            matches = [t for t in titles if query in t.lower()]
+            return matches if len(matches) >= self.limit else None
+        return None
+
+    def _store(self, query, titles):
+        self._cache[query] = titles
+        self._cache.move_to_end(query)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        self.on_results(titles[:self.limit])
+
+    def stats(self):
+        lookups = self.counters["lookups"]
+        hits = self.counters["exact_hits"] + self.counters["prefix_hits"] + self.counters["local_hits"]
+        return dict(self.counters, hit_rate=round(hits / lookups, 3) if lookups else 0.0)
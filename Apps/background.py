@@ -0,0 +1,109 @@
+import sys
+import queue
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+# ==========================================
+# 🧵 BACKGROUND FETCHER FOR TK
+# ==========================================
+# Tk widgets may only be touched from the main thread, so network work runs
+# on a small thread pool and its results are handed back through a queue
+# that the Tk loop drains with after(). Every job belongs to a "channel"
+# (e.g. "detail", "search"); submitting a new job on a channel makes any
+# older job on that channel stale, so a slow response for a row the user
+# already clicked away from is simply dropped.
+class BackgroundFetcher:
+    def __init__(self, root, max_workers=4, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._results = queue.Queue()
+        self._tickets = itertools.count(1)
+        self._current = {}   # channel -> (ticket, future)
+        self._closed = False
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None):
+        """Runs `fn(*args)` off the main thread; `on_done(result)` is called back on the Tk loop."""
+        self.cancel(channel)
+        ticket = next(self._tickets)
+        # Claim the channel before the worker can start, so _run sees itself as current.
+        self._current[channel] = (ticket, None)
+        future = self._executor.submit(self._run, channel, ticket, fn, args, on_done, on_error)
+        if self.is_current(channel, ticket):
+            self._current[channel] = (ticket, future)
+        return ticket
+
+    def cancel(self, channel):
+        """Drops the pending job on `channel`. A job already running finishes but is ignored."""
+        pending = self._current.pop(channel, None)
+        if pending and pending[1] is not None:
+            pending[1].cancel()
+
+    def is_current(self, channel, ticket):
+        current = self._current.get(channel)
+        return current is not None and current[0] == ticket
+
+    def _run(self, channel, ticket, fn, args, on_done, on_error):
+        # Skip work that went stale while it was waiting for a worker.
+        if not self.is_current(channel, ticket):
+            telemetry.count("background_jobs_total", channel=channel, result="stale")
+            return
+        try:
+            with telemetry.span("worker", channel=channel, job=getattr(fn, '__name__', None)):
+                result = fn(*args)
+        except Exception as e:
+            self._results.put((channel, ticket, on_error, e))
+        else:
+            self._results.put((channel, ticket, on_done, result))
+
+    def _poll(self):
+        if self._closed:
+            return
+        try:
+            while True:
+                try:
+                    channel, ticket, callback, payload = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if not self.is_current(channel, ticket):
+                    telemetry.count("background_jobs_total", channel=channel, result="dropped")
+                    continue
+                del self._current[channel]
+                if callback:
+                    self._call(channel, callback, payload)
+        finally:
+            # Keep polling whatever happened above, or every later result would be lost
+            self.root.after(self.poll_ms, self._poll)
+
+    def _call(self, channel, callback, payload):
+        # Widget work done on the Tk thread once the result is back
+        try:
+            with telemetry.span("tk_callback", channel=channel, callback=getattr(callback, '__name__', None)):
+                callback(payload)
+        except Exception:
+            # Reported the way Tk reports any failing callback (a traceback on stderr by default)
+            telemetry.count("background_jobs_total", channel=channel, result="callback_error")
+            self.root.report_callback_exception(*sys.exc_info())
+
+    def shutdown(self):
+        self._closed = True
+        self._current.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# ==========================================
+# 🔁 IN-PLACE LIST UPDATES
+# ==========================================
+def update_rows(listbox, labels):
+    """Makes `listbox` show `labels`, touching only rows whose text differs (scroll position is kept)."""
+    old = listbox.get(0, "end")
+    for row, label in enumerate(labels):
+        if row < len(old) and old[row] == label:
+            continue
+        if row < len(old):
+            listbox.delete(row)
+        listbox.insert(row, label)
+    if len(old) > len(labels):
+        listbox.delete(len(labels), "end")
@@ -0,0 +1,164 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+import http_client
+import telemetry
+
+# ==========================================
+# ⚙️ 1. BATCH CONFIG
+# ==========================================
+# Non-interactive recommendations: one JSON query per input line, one JSON
+# result per output line, written as soon as that query finishes (so the
+# output is in completion order; "line" ties a result to its query).
+#   {"seed": "Inception", "year": "2010", "genre": "thriller", "actor": "", "source": "tmdb"}
+#   {"seed": "Inception + Heat"}                       several seeds, as in app.py
+#   {"genre": "sci-fi", "year": "1999"}                no seed: discovery
+#   {"seed": "Frieren", "genre": "fantasy", "source": "anilist"}
+#   {"seed": "Akira", "source": "all"}               TMDB and AniList merged (federated.py)
+# Queries share the process-wide pantry, connection pools, rate limiter,
+# title index and recommendation graph, so repeated seeds cost nothing
+# and a nightly run warms the caches the apps read from.
+DEFAULT_WORKERS = 8
+DEFAULT_COUNT = 10
+SOURCES = ("tmdb", "anilist", "all")
+
+def _text(value):
+    return str(value).strip() if value is not None else ""
+
+# ==========================================
+# 🔎 2. ONE QUERY PER SOURCE
+# ==========================================
+def run_tmdb(query, count):
+    import app
+    seed, year, theme = _text(query.get('seed')), _text(query.get('year')), _text(query.get('genre')).lower()
+    _, found = app.search_movies(seed, year, theme, _text(query.get('actor')))
+    movies, ranking, headline = app.rank_movies(found, seed, year, theme)
+    results = [{"id": m.id, "title": m.title, "year": (m.release_date or "")[:4], "rating": m.vote_average,
+                "score": round(ranking[m.id]['score'] if m.id in ranking else m.graph_score or 0, 4)}
+               for m in movies[:count]]
+    return results, headline
+
+def run_anilist(query, count):
+    import anime_app
+    seed, year, genre = _text(query.get('seed')), _text(query.get('year')), _text(query.get('genre'))
+    variables = {"search": seed or None, "genre": genre.capitalize() or None,
+                 "year": int(year) if year.isdigit() else None}
+    payload = anime_app.search_anime(seed, variables)
+    shows, ranking = payload if payload else ([], {})
+    results = [{"id": a.id, "title": a.display_title, "year": a.seasonYear, "rating": a.averageScore,
+                "score": round(ranking[a.id]['score'], 4) if a.id in ranking else None}
+               for a in shows[:count]]
+    return results, None
+
+def run_all(query, count):
+    from federated import federated_search, SOURCE_NAMES
+    seed, year = _text(query.get('seed')), _text(query.get('year'))
+    if not seed:
+        raise ValueError("source 'all' needs a seed title")
+    hits, missing = federated_search(seed, year if year.isdigit() else None)
+    headline = "; ".join(f"{SOURCE_NAMES[source]} {reason}" for source, reason in missing.items()) or None
+    return [hit.as_dict() for hit in hits[:count]], headline
+
+RUNNERS = {"tmdb": run_tmdb, "anilist": run_anilist, "all": run_all}
+
+def process(line_no, query):
+    started = time.perf_counter()
+    record = {"line": line_no, "query": query}
+    try:
+        source = query.get('source', "tmdb")
+        if source not in RUNNERS:
+            raise ValueError(f"unknown source {source!r} (expected one of {', '.join(SOURCES)})")
+        with telemetry.span("batch_query", source=source):
+            results, headline = RUNNERS[source](query, int(query.get('count', DEFAULT_COUNT)))
+        record.update(results=results, headline=headline)
+    except Exception as exc:
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+# ==========================================
+# 🚚 3. STREAMING RUNNER
+# ==========================================
+def read_queries(stream):
+    """Yields (line number, query dict); malformed lines become error records downstream."""
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            query = json.loads(line)
+        except json.JSONDecodeError as exc:
+            query = {"_invalid": line.strip(), "_error": str(exc)}
+        yield line_no, query if isinstance(query, dict) else {"_invalid": line.strip(), "_error": "not an object"}
+
+def run_batch(queries, out, workers=DEFAULT_WORKERS):
+    """Processes (line, query) pairs with at most `workers` in flight, writing each result as it lands.
+
+    Input is read lazily, so a file of thousands of seeds never sits in memory
+    as futures. Returns (processed, failed).
+    """
+    import app
+    # No crawler thread per multi-seed query; deepen the graph with rec_graph.py instead
+    app.GRAPH_CRAWL = 0
+    processed = failed = 0
+    write_lock = threading.Lock()
+
+    def emit(record):
+        nonlocal processed, failed
+        with write_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            processed += 1
+            failed += "error" in record
+
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for line_no, query in queries:
+            if "_invalid" in query:
+                emit({"line": line_no, "error": f"invalid JSON: {query['_error']}"})
+                continue
+            if len(pending) >= workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+            pending.add(pool.submit(process, line_no, query))
+        for future in as_completed(pending):
+            emit(future.result())
+    return processed, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch recommendations (JSONL in, JSONL out).")
+    parser.add_argument("queries", nargs="?", default="-", help="JSONL file of queries (default: stdin)")
+    parser.add_argument("-o", "--out", default="-", help="JSONL file for results (default: stdout)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="queries processed at once")
+    parser.add_argument("--trace", action="store_true", help="write trace.jsonl / metrics.prom (see telemetry.py)")
+    parser.add_argument("--offline", action="store_true", help="answer from the pantry only, expired entries included")
+    args = parser.parse_args(argv)
+    if args.trace:
+        telemetry.enable()
+    if args.offline:
+        http_client.set_offline()
+
+    # Each query plan runs up to four lookups at once; give the pools room for all of them
+    http_client.configure(pool_sizes={"api.themoviedb.org": max(http_client.DEFAULT_POOL_SIZE, args.workers * 2),
+                                      "graphql.anilist.co": max(4, args.workers)})
+    source = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        processed, failed = run_batch(read_queries(source), out, workers=args.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"📦 {processed} queries in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f}/s), {failed} failed",
+          file=sys.stderr)
+    return 1 if failed and failed == processed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,696 @@
+import os
+import re
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import abc
+import builtins
+import platform
+import tempfile
+import threading
+import tkinter as tk
+from collections import Counter
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# ==========================================
+# ⚙️ 1. BENCHMARK CONFIG
+# ==========================================
+# End-to-end latency of the apps' search paths against local stand-ins
+# for TMDB (REST) and AniList (GraphQL). Both servers answer from the
+# recorded fixtures in bench_fixtures/ with configurable latency, jitter
+# and injected 429s, and count requests and bytes. Every scenario runs
+# twice: "cold" (pantry, poster cache, recommendation graph, title index
+# and connection pools all reset before each iteration) and "warm" (same
+# query repeated after one untimed warm-up). An iteration that raised, or
+# that was answered with an error status after the client's retries
+# (prefetches included), counts as an error and not as a latency sample.
+#
+#   python benchmark.py --iterations 20 --out run.json
+#   python benchmark.py --baseline run.json          # compare against an earlier run
+#   python benchmark.py --record                     # refresh fixtures from the real APIs
+#
+# The GUI scenarios need a display (use xvfb-run on a headless box); the
+# windows are withdrawn and driven through their own Tk event loop.
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+SEARCH_TITLES = ["Inception", "The Matrix", "Interstellar", "Fight Club", "Heat", "Spirited Away"]
+ANIME_TITLES = ["Attack on Titan", "Death Note", "Steins;Gate", "Cowboy Bebop", "Your Name"]
+PAGE_SIZE = 20
+WAIT_TIMEOUT = 30.0
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost")   # the only hosts a scenario may reach
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+# ==========================================
+# 🎭 2. FAKE API SERVERS
+# ==========================================
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def _serve(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        server.begin(len(self.requestline) + len(body))
+        status, payload = 500, b""
+        try:
+            time.sleep(server.delay())
+            headers = {}
+            if server.inject_429():
+                status, payload = 429, b'{"status_message": "Too Many Requests"}'
+                content_type = "application/json"
+                headers["Retry-After"] = str(server.retry_after)
+            else:
+                status, payload, content_type = server.route(method, self.path, body)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            server.end(status, len(payload))
+
+class FakeAPI(ThreadingHTTPServer, metaclass=abc.ABCMeta):
+    daemon_threads = True
+
+    def __init__(self, fixtures, latency_ms=40, jitter_ms=10, rate_429=0.0, retry_after=1, seed=1):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fixtures = fixtures
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.counters = Counter()
+        self.active = 0
+        self._lock = threading.Lock()
+        self._image = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name=type(self).__name__).start()
+        return self
+
+    def delay(self):
+        with self._lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def inject_429(self):
+        with self._lock:
+            return self.rng.random() < self.rate_429
+
+    def begin(self, bytes_in):
+        with self._lock:
+            self.active += 1
+            self.counters["bytes_in"] += bytes_in
+
+    def end(self, status, bytes_out):
+        with self._lock:
+            self.active -= 1
+            self.counters["requests"] += 1
+            self.counters[f"status_{status}"] += 1
+            self.counters["bytes_out"] += bytes_out
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.counters)
+
+    def wait_idle(self, quiet=0.05, timeout=WAIT_TIMEOUT):
+        """Waits until no request has been in flight for `quiet` seconds (prefetches included)."""
+        deadline = time.perf_counter() + timeout
+        idle_since = None
+        while time.perf_counter() < deadline:
+            if self.active:
+                idle_since = None
+            elif idle_since is None:
+                idle_since = time.perf_counter()
+            elif time.perf_counter() - idle_since >= quiet:
+                return
+            time.sleep(0.005)
+
+    def image(self):
+        """A poster-sized noisy JPEG (a flat colour would compress unrealistically well)."""
+        if self._image is None:
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.effect_noise((500, 750), 48).convert("RGB").save(buffer, "JPEG", quality=80)
+            self._image = buffer.getvalue()
+        return self._image
+
+    @abc.abstractmethod
+    def route(self, method, path, body):
+        """(status, payload bytes, content type) for one request."""
+
+def _json(status, value):
+    return status, json.dumps(value).encode("utf-8"), "application/json;charset=utf-8"
+
+class FakeTMDB(FakeAPI):
+    GENRES = {28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+              18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+              9648: "Mystery", 10749: "Romance", 878: "Science Fiction", 10770: "TV Movie", 53: "Thriller",
+              10752: "War", 37: "Western"}
+
+    def __init__(self, fixtures, **options):
+        super().__init__(fixtures, **options)
+        self.movies = {m['id']: m for m in fixtures['movies']}
+        self.people = {p['id']: p for m in fixtures['movies'] for p in m['cast']}
+
+    def _listing(self, movie):
+        hidden = ("cast", "keyword_ids")
+        return dict({k: v for k, v in movie.items() if k not in hidden},
+                    adult=False, video=False, vote_count=int(movie['popularity'] * 100), backdrop_path=None)
+
+    def _page(self, items, params):
+        page = int(params.get("page", 1))
+        chunk = items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return {"page": page, "results": chunk, "total_results": len(items),
+                "total_pages": max(1, -(-len(items) // PAGE_SIZE))}
+
+    def route(self, method, path, body):
+        parts = urlsplit(path)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        route = parts.path[2:] if parts.path.startswith("/3/") else parts.path
+        by_popularity = sorted(self.movies.values(), key=lambda m: -m['popularity'])
+
+        if route.startswith("/t/p/"):
+            return 200, self.image(), "image/jpeg"
+        if route == "/configuration":
+            return _json(200, {"images": {"secure_base_url": f"{self.base_url}/t/p/",
+                                          "poster_sizes": ["w92", "w154", "w185", "w342", "w500", "w780", "original"]}})
+        if route == "/genre/movie/list":
+            return _json(200, {"genres": [{"id": k, "name": v} for k, v in self.GENRES.items()]})
+        if route == "/search/movie":
+            query = params.get("query", "").lower()
+            return _json(200, self._page([self._listing(m) for m in by_popularity if query in m['title'].lower()], params))
+        if route == "/search/person":
+            query = params.get("query", "").lower()
+            return _json(200, self._page([p for p in self.people.values() if query in p['name'].lower()], params))
+        if route == "/search/keyword":
+            query = params.get("query", "").lower()
+            return _json(200, self._page([k for k in self.fixtures['keywords'] if query in k['name'].lower()], params))
+        if route == "/discover/movie":
+            return _json(200, self._page([self._listing(m) for m in self._discover(params)], params))
+
+        match = re.fullmatch(r"/movie/(\d+)(/recommendations)?", route)
+        if not match or int(match.group(1)) not in self.movies:
+            return _json(404, {"status_message": "The resource you requested could not be found."})
+        movie = self.movies[int(match.group(1))]
+        if match.group(2):
+            genres = set(movie['genre_ids'])
+            others = sorted((m for m in self.movies.values() if m['id'] != movie['id']),
+                            key=lambda m: (-len(genres & set(m['genre_ids'])), -m['popularity']))
+            return _json(200, self._page([self._listing(m) for m in others], params))
+
+        details = self._listing(movie)
+        details["genres"] = [{"id": g, "name": self.GENRES.get(g, str(g))} for g in details.pop("genre_ids")]
+        details.update(runtime=120, tagline="")
+        for extra in params.get("append_to_response", "").split(","):
+            if extra == "credits":
+                details["credits"] = {"cast": [dict(p, character="") for p in movie['cast']], "crew": []}
+            elif extra == "videos":
+                details["videos"] = {"results": [{"key": f"bench{movie['id']}", "site": "YouTube", "type": "Trailer"}]}
+            elif extra == "keywords":
+                details["keywords"] = {"keywords": [k for k in self.fixtures['keywords'] if k['id'] in movie['keyword_ids']]}
+        return _json(200, details)
+
+    def _discover(self, params):
+        found = list(self.movies.values())
+        if params.get("primary_release_year"):
+            found = [m for m in found if m['release_date'].startswith(params["primary_release_year"])]
+        for genre in filter(None, params.get("with_genres", "").split(",")):
+            found = [m for m in found if int(genre) in m['genre_ids']]
+        if params.get("with_cast"):
+            found = [m for m in found if int(params["with_cast"]) in {p['id'] for p in m['cast']}]
+        if params.get("with_keywords"):
+            found = [m for m in found if int(params["with_keywords"]) in m['keyword_ids']]
+        column = params.get("sort_by", "popularity.desc").split(".")[0]
+        column = {"primary_release_date": "release_date"}.get(column, column)
+        return sorted(found, key=lambda m: m.get(column) or 0, reverse=True)
+
+def _strip_arguments(text):
+    while True:
+        stripped = re.sub(r"\([^()]*\)", "", text)
+        if stripped == text:
+            return text
+        text = stripped
+
+def _selection(text):
+    """Selection set of one GraphQL field -> {response key: (field name, sub-selection or None)}."""
+    tokens = re.findall(r"\w+|[{}:]", _strip_arguments(text))
+
+    def block(i):
+        tree = {}
+        while i < len(tokens) and tokens[i] != "}":
+            key = name = tokens[i]
+            i += 1
+            if i < len(tokens) and tokens[i] == ":":
+                name, i = tokens[i + 1], i + 2
+            sub = None
+            if i < len(tokens) and tokens[i] == "{":
+                sub, i = block(i + 1)
+            tree[key] = (name, sub)
+        return tree, i + 1
+
+    return block(0)[0]
+
+def _project(value, tree):
+    """Keeps only the requested fields, like a real GraphQL server (so payload sizes are honest)."""
+    if tree is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    return {key: _project(value.get(name), sub) for key, (name, sub) in tree.items()}
+
+class FakeAniList(FakeAPI):
+    def __init__(self, fixtures, **options):
+        super().__init__(fixtures, **options)
+        self.media = {a['id']: a for a in fixtures['media']}
+
+    def _anime(self, anime, with_recommendations=True):
+        full = dict(anime, type="ANIME", startDate={"year": anime['seasonYear']},
+                    coverImage={"large": f"{self.base_url}/img/{anime['id']}.jpg",
+                                "medium": f"{self.base_url}/img/{anime['id']}.jpg"})
+        if with_recommendations:
+            genres = set(anime['genres'])
+            others = sorted((a for a in self.media.values() if a['id'] != anime['id']),
+                            key=lambda a: (-len(genres & set(a['genres'])), -a['popularity']))[:10]
+            full["recommendations"] = {"nodes": [{"mediaRecommendation": self._anime(a, False)} for a in others]}
+        return full
+
+    def _arguments(self, field_text, variables):
+        args = {}
+        for name, raw in re.findall(r'(\w+)\s*:\s*(\$\w+|-?\d+|"[^"]*"|\w+)', field_text.split("{")[0] + field_text):
+            if raw.startswith("$"):
+                args[name] = variables.get(raw[1:])
+            elif raw.lstrip("-").isdigit():
+                args[name] = int(raw)
+            else:
+                args[name] = raw.strip('"')
+        return args
+
+    def _search(self, args):
+        found = sorted(self.media.values(), key=lambda a: -a['popularity'])
+        if args.get("search"):
+            query = args["search"].lower()
+            found = [a for a in found if query in f"{a['title']['english']} {a['title']['romaji']}".lower()]
+        if args.get("genre"):
+            found = [a for a in found if args["genre"] in a['genres']]
+        if args.get("seasonYear"):
+            found = [a for a in found if a['seasonYear'] == args["seasonYear"]]
+        return found
+
+    def _resolve(self, name, args):
+        if name == "Page":
+            found = self._search(args)
+            page, per_page = args.get("page") or 1, args.get("perPage") or 50
+            chunk = found[(page - 1) * per_page:page * per_page]
+            return {"pageInfo": {"currentPage": page, "hasNextPage": page * per_page < len(found)},
+                    "media": [self._anime(a) for a in chunk]}
+        if name == "Media":
+            if args.get("id") is not None:
+                anime = self.media.get(args["id"])
+            else:
+                anime = next(iter(self._search(args)), None)
+            return self._anime(anime) if anime else None
+        if name == "GenreCollection":
+            return sorted({g for a in self.media.values() for g in a['genres']})
+        if name == "MediaTagCollection":
+            return [{"name": "Time Travel", "description": "", "category": "Theme"}]
+        return None
+
+    def route(self, method, path, body):
+        if path.startswith("/img/"):
+            return 200, self.image(), "image/jpeg"
+        from graphql_batch import parse_operation
+        request = json.loads(body or b"{}")
+        variables = request.get("variables") or {}
+        try:
+            _, fields = parse_operation(request.get("query", ""))
+        except ValueError as e:
+            return _json(400, {"data": None, "errors": [{"message": str(e)}]})
+        data = {}
+        for key, field_text in fields:
+            name = re.match(r"\w+", field_text).group()
+            tree = _selection(field_text)[name][1]
+            data[key] = _project(self._resolve(name, self._arguments(field_text, variables)), tree)
+        return _json(200, {"data": data})
+
+# ==========================================
+# 🏃 3. SCENARIOS
+# ==========================================
+def _scripted_input(answers):
+    answers = iter(answers)
+    return lambda prompt="": next(answers, "")
+
+def cli_scenario(answers):
+    """One run of app.main() with scripted answers to its prompts."""
+    def run(query):
+        import app
+        original = builtins.input
+        builtins.input = _scripted_input([a.format(query=query) for a in answers])
+        try:
+            with redirect_stdout(io.StringIO()):
+                app.main()
+        finally:
+            builtins.input = original
+    return run
+
+def _pump_until(root, done):
+    deadline = time.perf_counter() + WAIT_TIMEOUT
+    while not done.is_set():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("the window never showed a result")
+        root.update()
+        time.sleep(0.001)
+
+def _watch(gui, *names):
+    """Wraps gui.<name> callbacks so an Event is set once any of them has run on the Tk thread."""
+    done = threading.Event()
+    for name in names:
+        def wrapped(*args, _original=getattr(gui, name)):
+            try:
+                return _original(*args)
+            finally:
+                done.set()
+        setattr(gui, name, wrapped)
+    return done
+
+def _type_into(gui, variable, entries, text):
+    variable.set(text)
+    gui.autocomplete.cancel()      # the benchmark measures searches, not suggestions
+    for entry in entries:
+        entry.delete(0, "end")
+
+class GuiScenarios:
+    def __init__(self, root):
+        import gui_app
+        import anime_app
+        from poster_cache import PosterCache
+        self.root = root
+        self.PosterCache = PosterCache
+        self.movies = gui_app.MovieEngineGUI(root)
+        self.movie_results = _watch(self.movies, "show_results", "show_search_error")
+        self.movie_details = _watch(self.movies, "show_details", "show_detail_error")
+        self.anime_window = tk.Toplevel(root)
+        self.anime_window.withdraw()
+        self.anime = anime_app.AnimeEngineGUI(self.anime_window)
+        self.anime_results = _watch(self.anime, "show_results", "show_search_error")
+
+    def movie_search(self, query):
+        _type_into(self.movies, self.movies.movie_text_var, [self.movies.entry_year, self.movies.entry_theme], query)
+        self.movie_results.clear()
+        self.movies.perform_search()
+        _pump_until(self.root, self.movie_results)
+
+    def movie_select(self, query):
+        # Search untimed is not possible here: the click is only meaningful on fresh results
+        self.movie_search(query)
+        self.movies.posters = self.PosterCache()
+        self.movies.results_list.selection_clear(0, "end")
+        self.movies.results_list.selection_set(0)
+        self.movie_details.clear()
+        self.movies.on_select_movie(None)
+        _pump_until(self.root, self.movie_details)
+
+    def anime_search(self, query):
+        _type_into(self.anime, self.anime.anime_text_var, [self.anime.entry_year, self.anime.entry_genre], query)
+        self.anime_results.clear()
+        self.anime.perform_search()
+        _pump_until(self.root, self.anime_results)
+
+CLI_SCENARIOS = {
+    # Base movie, year, genre/keyword, actor, mode, then the prompts after the list
+    "cli_recommendations": (cli_scenario(["{query}", "", "", "", "1", ""]), SEARCH_TITLES),
+    "cli_filtered_recommendations": (cli_scenario(["{query}", "", "thriller", "", "1", ""]), SEARCH_TITLES),
+    "cli_details": (cli_scenario(["{query}", "", "", "", "1", "1", "n", "n", ""]), SEARCH_TITLES),
+    "cli_discover": (cli_scenario(["", "", "{query}", "", "1", ""]), ["thriller", "drama", "sci-fi", "action"]),
+}
+GUI_SCENARIOS = {
+    "gui_movie_search": ("movie_search", SEARCH_TITLES),
+    "gui_movie_select": ("movie_select", SEARCH_TITLES),
+    "gui_anime_search": ("anime_search", ANIME_TITLES),
+}
+
+def reset_caches():
+    """Everything a first run on a fresh install would start without."""
+    import http_client
+    from pantry import get_pantry
+    from rec_graph import get_graph
+    from title_index import get_title_index
+    get_pantry().clear()
+    shutil.rmtree("poster_cache", ignore_errors=True)
+    get_graph().clear()
+    for source in ("tmdb", "anilist"):
+        get_title_index(source).clear()
+    http_client.close_all()     # new keep-alive connections, as after a restart
+
+def failed_responses():
+    import http_client
+    return Counter(http_client.failed)
+
+def _describe(failures):
+    return "error responses: " + ", ".join(f"HTTP {status} x{count} from {host}"
+                                           for (host, status), count in sorted(failures.items()))
+
+def measure(run, queries, iterations, phase, servers):
+    """Runs one scenario phase; returns its latency percentiles and server-side traffic."""
+    latencies, errors = [], []
+    before = {name: server.snapshot() for name, server in servers.items()}
+    warmup_error = None
+    if phase == "warm":
+        failed_before = failed_responses()
+        try:
+            run(queries[0])
+        except Exception as e:
+            warmup_error = f"{type(e).__name__}: {e}"
+        for server in servers.values():
+            server.wait_idle()
+        failures = failed_responses() - failed_before
+        if failures and not warmup_error:
+            warmup_error = _describe(failures)
+        before = {name: server.snapshot() for name, server in servers.items()}
+
+    for i in range(iterations):
+        query = queries[i % len(queries)] if phase == "cold" else queries[0]
+        if phase == "cold":
+            reset_caches()
+        failed_before = failed_responses()
+        started = time.perf_counter()
+        try:
+            run(query)
+            latency, error = (time.perf_counter() - started) * 1000, None
+        except Exception as e:
+            latency, error = None, f"{type(e).__name__}: {e}"
+        # Prefetches started by this iteration are billed to it, not to the next one
+        for server in servers.values():
+            server.wait_idle()
+        # A run that got an error status back may look fast only because it showed nothing
+        failures = failed_responses() - failed_before
+        if failures and not error:
+            error = _describe(failures)
+        if error:
+            errors.append(error)
+        else:
+            latencies.append(latency)
+
+    result = {"iterations": iterations, "errors": len(errors)}
+    if errors:
+        result["first_error"] = errors[0]
+    if warmup_error:
+        result["warmup_error"] = warmup_error
+    if latencies:
+        result.update({f"p{pct}_ms": round(percentile(latencies, pct), 2) for pct in (50, 95, 99)})
+        result.update(mean_ms=round(sum(latencies) / len(latencies), 2),
+                      min_ms=round(min(latencies), 2), max_ms=round(max(latencies), 2))
+    for name, server in servers.items():
+        delta = server.snapshot() - before[name]
+        result[name] = dict(sorted(delta.items()), requests_per_iteration=round(delta["requests"] / iterations, 2))
+    return result
+
+# ==========================================
+# 📊 4. BASELINE COMPARISON
+# ==========================================
+def compare(baseline, current, max_regression):
+    """Prints p50/p95 changes per scenario; returns the scenarios that got slower than allowed."""
+    regressions = []
+    print(f"\n{'SCENARIO':<40} {'METRIC':<7} {'BASE':>9} {'NOW':>9} {'CHANGE':>8}")
+    for name, now in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or "p50_ms" not in base or "p50_ms" not in now:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            change = (now[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+            flag = " ⚠️" if change > max_regression else ""
+            print(f"{name:<40} {metric[:3]:<7} {base[metric]:>9.1f} {now[metric]:>9.1f} {change:>+7.1%}{flag}")
+            if change > max_regression:
+                regressions.append(f"{name} {metric}")
+    return regressions
+
+# ==========================================
+# 🎙️ 5. FIXTURE RECORDING
+# ==========================================
+def record_fixtures(movie_count=40, anime_count=50):
+    """Rewrites bench_fixtures/ from the live APIs (needs TMDB_TOKEN and BASE_URL in .env)."""
+    import http_client
+    from dotenv import load_dotenv
+    load_dotenv()
+    base_url = os.getenv('BASE_URL')
+    headers = {"accept": "application/json", "Authorization": f"Bearer {os.getenv('TMDB_TOKEN')}"}
+
+    popular = []
+    for page in range(1, -(-movie_count // PAGE_SIZE) + 1):
+        popular += http_client.get(f"{base_url}/movie/popular", headers=headers, params={"page": page}).json()['results']
+    movies, keywords = [], {}
+    for listing in popular[:movie_count]:
+        details = http_client.get(f"{base_url}/movie/{listing['id']}", headers=headers,
+                                  params={"append_to_response": "credits,keywords"}).json()
+        found = details.get('keywords', {}).get('keywords', [])
+        keywords.update((k['id'], k['name']) for k in found)
+        movies.append({**{k: listing.get(k) for k in ("id", "title", "original_title", "release_date", "genre_ids",
+                                                       "vote_average", "popularity", "poster_path", "overview",
+                                                       "original_language")},
+                       "cast": [{"id": p['id'], "name": p['name']} for p in details.get('credits', {}).get('cast', [])[:5]],
+                       "keyword_ids": [k['id'] for k in found]})
+    with open(os.path.join(FIXTURE_DIR, "tmdb.json"), "w", encoding="utf-8") as f:
+        json.dump({"movies": movies, "keywords": [{"id": k, "name": v} for k, v in keywords.items()]},
+                  f, indent=1, ensure_ascii=False)
+
+    query = ('query ($n: Int) { Page(perPage: $n) { media(type: ANIME, sort: POPULARITY_DESC) {'
+             ' id title { romaji english } genres averageScore seasonYear popularity description } } }')
+    response = http_client.post("https://graphql.anilist.co", json={"query": query, "variables": {"n": anime_count}})
+    with open(os.path.join(FIXTURE_DIR, "anilist.json"), "w", encoding="utf-8") as f:
+        json.dump({"media": response.json()['data']['Page']['media']}, f, indent=1, ensure_ascii=False)
+    print(f"🎙️ Recorded {len(movies)} movies and {anime_count} anime into {FIXTURE_DIR}")
+
+# ==========================================
+# 🚀 6. ENTRY POINT
+# ==========================================
+def _load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against local API stand-ins.")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", help="comma-separated subset (default: all)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed p50/p95 slowdown vs baseline")
+    parser.add_argument("--record", action="store_true", help="refresh bench_fixtures/ from the real APIs and exit")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixtures()
+        return 0
+
+    options = dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                   retry_after=args.retry_after, seed=args.seed)
+    servers = {"tmdb": FakeTMDB(_load_fixture("tmdb.json"), **options).start(),
+               "anilist": FakeAniList(_load_fixture("anilist.json"), **options).start()}
+
+    # Everything the apps persist goes to a scratch directory; set before the apps are imported
+    out_path = os.path.abspath(args.out)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    os.environ.update(BASE_URL=f"{servers['tmdb'].base_url}/3", TMDB_TOKEN="benchmark",
+                      PANTRY_DB=os.path.join(workdir, "pantry.db"),
+                      TITLE_INDEX_DB=os.path.join(workdir, "titles.db"),
+                      REC_GRAPH_DB=os.path.join(workdir, "graph.db"),
+                      WATCHLIST_DB=os.path.join(workdir, "watchlist.db"),
+                      CATALOG_INDEX=os.path.join(workdir, "no_catalog.npz"))
+    os.chdir(workdir)
+
+    import http_client
+    import rate_limit
+    import anime_app
+    # Scenarios must only ever reach the local stand-ins
+    http_client.configure(allowed_hosts=LOOPBACK_HOSTS)
+    # Mirror the real hosts' limits so injected 429s go through the same retry path
+    anilist_host = "localhost"
+    anime_app.ANILIST_URL = f"http://{anilist_host}:{servers['anilist'].server_address[1]}/"
+    rate_limit.HOST_LIMITS["127.0.0.1"] = rate_limit.HOST_LIMITS["api.themoviedb.org"]
+    rate_limit.HOST_LIMITS[anilist_host] = rate_limit.HOST_LIMITS["graphql.anilist.co"]
+
+    selected = set(args.scenarios.split(",")) if args.scenarios else set(CLI_SCENARIOS) | set(GUI_SCENARIOS)
+    scenarios = {name: spec for name, spec in CLI_SCENARIOS.items() if name in selected}
+    skipped = {}
+    wanted_gui = [name for name in GUI_SCENARIOS if name in selected]
+    if wanted_gui:
+        try:
+            root = tk.Tk()
+            root.withdraw()
+            gui = GuiScenarios(root)
+            scenarios.update({name: (getattr(gui, method), queries)
+                              for name, (method, queries) in GUI_SCENARIOS.items() if name in wanted_gui})
+        except tk.TclError as e:
+            skipped.update({name: f"no display: {e}" for name in wanted_gui})
+
+    results = {}
+    for name, (run, queries) in scenarios.items():
+        for phase in ("cold", "warm"):
+            results[f"{name}/{phase}"] = measure(run, queries, args.iterations, phase, servers)
+            summary = results[f"{name}/{phase}"]
+            print(f"⏱️ {name}/{phase}: p50 {summary.get('p50_ms', '-')} ms, p95 {summary.get('p95_ms', '-')} ms, "
+                  f"{summary['tmdb']['requests_per_iteration'] + summary['anilist']['requests_per_iteration']} req/iter"
+                  + (f", {summary['errors']} errors" if summary['errors'] else "")
+                  + (", warm-up failed" if summary.get('warmup_error') else ""))
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "config": options, "iterations": args.iterations},
+        "scenarios": results,
+        "skipped": skipped,
+        "blocked_hosts": dict(http_client.blocked),
+        "rate_limits": rate_limit.stats(),
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for host, limiter in report["rate_limits"].items():
+        print(f"🪣 {host}: {limiter['requests']} requests, {limiter['throttled']} throttled, "
+              f"wait avg {limiter['avg_wait_ms']} ms / max {limiter['max_wait_ms']} ms")
+    print(f"📄 Results written to {out_path}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if http_client.blocked:
+        print(f"\n❌ Scenarios tried to reach non-local hosts: {dict(http_client.blocked)}")
+        return 1
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.max_regression)
+        if regressions:
+            print(f"\n❌ Slower than baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
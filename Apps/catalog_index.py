@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import threading
+
+import numpy as np
+
+from records import Movie
+
+# ==========================================
+# ⚙️ 1. CATALOG CONFIG
+# ==========================================
+# An offline copy of the movie catalog for /discover-style queries. A
+# TMDB-style JSONL dump (one movie per line, e.g. /movie/{id} with
+# credits and keywords appended) is ingested once into:
+#   * numeric columns (year, popularity, vote average) as NumPy arrays
+#   * a genre bitmask per movie
+#   * CSR inverted indexes (cast ID -> rows, keyword ID -> rows)
+#   * the display text as one JSON blob with row offsets, decoded only
+#     for the rows a query actually returns
+# Queries that the index can't answer (missing file, unknown genre, no
+# matches) return None so callers fall back to the network.
+CATALOG_FILE = os.getenv('CATALOG_INDEX', "catalog_index.npz")
+
+# TMDB movie genre IDs, one bit each
+GENRE_BITS = {genre_id: bit for bit, genre_id in enumerate(
+    [12, 14, 16, 18, 27, 28, 35, 36, 37, 53, 80, 99, 878, 9648, 10402, 10749, 10751, 10752, 10770])}
+SORT_COLUMNS = {"popularity": "popularity", "vote_average": "vote_average",
+                "primary_release_date": "year", "release_date": "year"}
+TEXT_FIELDS = ("title", "original_title", "release_date", "poster_path", "overview", "original_language")
+
+def _ids(raw, flat_key, nested_key, list_key):
+    if raw.get(flat_key) is not None:
+        return raw[flat_key]
+    return [item['id'] for item in (raw.get(nested_key) or {}).get(list_key, [])]
+
+def _csr(pairs):
+    """(key, row) pairs -> (sorted unique keys, offsets, rows)."""
+    if not pairs:
+        return np.zeros(0, np.int64), np.zeros(1, np.int64), np.zeros(0, np.int32)
+    pairs = np.array(pairs, dtype=np.int64)
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    keys, starts = np.unique(pairs[:, 0], return_index=True)
+    offsets = np.append(starts, len(pairs)).astype(np.int64)
+    return keys, offsets, pairs[:, 1].astype(np.int32)
+
+class CatalogIndex:
+    def __init__(self, columns):
+        self.columns = columns
+        self.ids = columns['ids']
+        self.year = columns['year']
+        self.popularity = columns['popularity']
+        self.vote_average = columns['vote_average']
+        self.genre_mask = columns['genre_mask']
+        self._text = columns['text'].tobytes()
+        self._text_offsets = columns['text_offsets']
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ==========================================
+    # 🏗️ 2. BUILD / SAVE / LOAD
+    # ==========================================
+    @classmethod
+    def build(cls, movies):
+        ids, years, popularity, votes, masks = [], [], [], [], []
+        cast_pairs, keyword_pairs = [], []
+        text, text_offsets = bytearray(), [0]
+        seen = set()
+        for raw in movies:
+            if not raw.get('id') or raw['id'] in seen or raw.get('adult'):
+                continue
+            seen.add(raw['id'])
+            row = len(ids)
+            ids.append(raw['id'])
+            release = raw.get('release_date') or ""
+            years.append(int(release[:4]) if release[:4].isdigit() else 0)
+            popularity.append(raw.get('popularity') or 0.0)
+            votes.append(raw.get('vote_average') or 0.0)
+            mask = 0
+            for genre_id in raw.get('genre_ids') or [g['id'] for g in raw.get('genres', [])]:
+                if genre_id in GENRE_BITS:
+                    mask |= 1 << GENRE_BITS[genre_id]
+            masks.append(mask)
+            cast_pairs.extend((person_id, row) for person_id in _ids(raw, 'cast_ids', 'credits', 'cast'))
+            keyword_pairs.extend((keyword_id, row) for keyword_id in _ids(raw, 'keyword_ids', 'keywords', 'keywords'))
+            text += json.dumps({f: raw.get(f) for f in TEXT_FIELDS}, ensure_ascii=False).encode('utf-8')
+            text_offsets.append(len(text))
+
+        cast_keys, cast_offsets, cast_rows = _csr(cast_pairs)
+        keyword_keys, keyword_offsets, keyword_rows = _csr(keyword_pairs)
+        return cls({
+            'ids': np.array(ids, dtype=np.int32),
+            'year': np.array(years, dtype=np.int16),
+            'popularity': np.array(popularity, dtype=np.float32),
+            'vote_average': np.array(votes, dtype=np.float32),
+            'genre_mask': np.array(masks, dtype=np.uint32),
+            'cast_keys': cast_keys, 'cast_offsets': cast_offsets, 'cast_rows': cast_rows,
+            'keyword_keys': keyword_keys, 'keyword_offsets': keyword_offsets, 'keyword_rows': keyword_rows,
+            'text': np.frombuffer(bytes(text), dtype=np.uint8),
+            'text_offsets': np.array(text_offsets, dtype=np.int64),
+        })
+
+    def save(self, path=CATALOG_FILE):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CATALOG_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    # ==========================================
+    # 🔎 3. QUERIES
+    # ==========================================
+    def _posting(self, name, key):
+        keys = self.columns[f'{name}_keys']
+        at = np.searchsorted(keys, key)
+        if at == len(keys) or keys[at] != key:
+            return np.zeros(0, np.int32)
+        offsets = self.columns[f'{name}_offsets']
+        return self.columns[f'{name}_rows'][offsets[at]:offsets[at + 1]]
+
+    def record(self, row):
+        start, end = self._text_offsets[row], self._text_offsets[row + 1]
+        text = json.loads(self._text[start:end].decode('utf-8'))
+        mask = int(self.genre_mask[row])
+        return Movie(int(self.ids[row]), text.get('title'), text.get('original_title'), text.get('release_date'),
+                     [g for g, bit in GENRE_BITS.items() if mask >> bit & 1],
+                     round(float(self.vote_average[row]), 3), float(self.popularity[row]),
+                     text.get('poster_path'), text.get('overview'))
+
+    def discover(self, year=None, genre_ids=(), cast_id=None, keyword_id=None,
+                 sort_by="popularity.desc", limit=20, offset=0):
+        """Movie records for the filters, or None if the index can't answer them."""
+        bits = 0
+        for genre_id in genre_ids:
+            if genre_id not in GENRE_BITS:
+                return None
+            bits |= 1 << GENRE_BITS[genre_id]
+        column, _, direction = sort_by.partition(".")
+        if column not in SORT_COLUMNS:
+            return None
+
+        rows = None
+        for name, key in (("cast", cast_id), ("keyword", keyword_id)):
+            if key:
+                posting = self._posting(name, int(key))
+                rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(self.ids), dtype=np.int32)
+
+        keep = np.ones(len(rows), dtype=bool)
+        if year:
+            keep &= self.year[rows] == int(year)
+        if bits:
+            keep &= (self.genre_mask[rows] & np.uint32(bits)) == bits
+        rows = rows[keep]
+        if not len(rows):
+            return None
+
+        values = getattr(self, SORT_COLUMNS[column])[rows].astype(np.float64)
+        if direction != "asc":
+            values = -values
+        wanted = min(offset + limit, len(rows))
+        if wanted < len(rows):
+            top = np.argpartition(values, wanted - 1)[:wanted]
+            rows, values = rows[top], values[top]
+        order = np.argsort(values, kind='stable')[offset:wanted]
+        return [self.record(int(row)) for row in rows[order]]
+
+    def discover_params(self, params, page=1):
+        """Answers a /discover/movie params dict as used by the apps, or None."""
+        supported = {"primary_release_year", "with_genres", "with_cast", "with_keywords", "sort_by", "page"}
+        params = {k: v for k, v in params.items() if v not in (None, "")}
+        if set(params) - supported:
+            return None
+        try:
+            genres = [int(g) for g in str(params.get("with_genres", "")).split(",") if g]
+            return self.discover(year=params.get("primary_release_year"), genre_ids=genres,
+                                 cast_id=params.get("with_cast"), keyword_id=params.get("with_keywords"),
+                                 sort_by=params.get("sort_by", "popularity.desc"), offset=(page - 1) * 20)
+        except ValueError:
+            return None
+
+# ==========================================
+# 🔌 4. APP INTEGRATION
+# ==========================================
+_catalog = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """The ingested catalog, or None if no index file has been built."""
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        with _catalog_lock:
+            if not _catalog_loaded:
+                _catalog = CatalogIndex.load() if os.path.exists(CATALOG_FILE) else None
+                _catalog_loaded = True
+    return _catalog
+
+def local_first(fetch_page, params):
+    """Wraps a /discover/movie fetch_page so the local catalog answers when it can.
+
+    The source is picked on page 1 and kept for later pages, so a list never mixes both.
+    """
+    source = {}
+
+    def fetch(page):
+        catalog = get_catalog()
+        if page == 1:
+            local = catalog.discover_params(params, page) if catalog else None
+            source['local'] = bool(local)
+            if local:
+                return local
+        elif source.get('local'):
+            return catalog.discover_params(params, page) or []
+        return fetch_page(page)
+
+    return fetch
+
+def ingest(jsonl_path, out_path=CATALOG_FILE):
+    def movies():
+        with open(jsonl_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    index = CatalogIndex.build(movies())
+    index.save(out_path)
+    return index
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python catalog_index.py <catalog_dump.jsonl> [output.npz]")
+        sys.exit(1)
+    built = ingest(*sys.argv[1:3])
+    print(f"✅ Indexed {len(built)} movies into {sys.argv[2] if len(sys.argv) > 2 else CATALOG_FILE}")
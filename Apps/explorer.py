@@ -1,4 +1,6 @@
-import requests
+import http_client
+import http_cache
+import telemetry
 import os
 from dotenv import load_dotenv
 
@@ -33,53 +35,60 @@ def explore_database():
         
         choice = input("\nEnter number (1-5): ")
 
-        if choice == '1':
-            url = f"{BASE_URL}/genre/movie/list"
-            data = requests.get(url, headers=headers).json()
-            print("\n📂 AVAILABLE MOVIE GENRES:")
-            # Tip: Look for ID 12 (Adventure) here!
-            for g in data.get('genres', []):
-                print(f"ID: {g['id']:<5} | Name: {g['name']}")
+        try:
+            if choice == '1':
+                url = f"{BASE_URL}/genre/movie/list"
+                data = http_cache.get_json(url, headers=headers)
+                print("\n📂 AVAILABLE MOVIE GENRES:")
+                # Tip: Look for ID 12 (Adventure) here!
+                for g in data.get('genres', []):
+                    print(f"ID: {g['id']:<5} | Name: {g['name']}")
 
-        elif choice == '2':
-            url = f"{BASE_URL}/person/popular"
-            data = requests.get(url, headers=headers).json()
-            print("\n🎭 TRENDING/POPULAR ACTORS:")
-            for p in data.get('results', []):
-                known_for = ", ".join([m.get('title', m.get('name', '')) for m in p.get('known_for', [])])
-                print(f"Name: {p['name']:<20} | Known for: {known_for}")
+            elif choice == '2':
+                url = f"{BASE_URL}/person/popular"
+                data = http_client.get(url, headers=headers).json()
+                print("\n🎭 TRENDING/POPULAR ACTORS:")
+                for p in data.get('results', []):
+                    known_for = ", ".join([m.get('title', m.get('name', '')) for m in p.get('known_for', [])])
+                    print(f"Name: {p['name']:<20} | Known for: {known_for}")
 
-        elif choice == '3':
-            url = f"{BASE_URL}/movie/now_playing"
-            data = requests.get(url, headers=headers).json()
-            print("\n🍿 TITLES CURRENTLY IN THEATERS:")
-            for m in data.get('results', []):
-                print(f"Title: {m['title']:<30} | ID: {m['id']} (Released: {m['release_date']})")
+            elif choice == '3':
+                url = f"{BASE_URL}/movie/now_playing"
+                data = http_client.get(url, headers=headers).json()
+                print("\n🍿 TITLES CURRENTLY IN THEATERS:")
+                for m in data.get('results', []):
+                    print(f"Title: {m['title']:<30} | ID: {m['id']} (Released: {m['release_date']})")
 
-        elif choice == '4':
-            print("\n⚙️ FETCHING API CONFIGURATIONS...")
-            # 1. Image Sizes
-            config_url = f"{BASE_URL}/configuration"
-            config_data = requests.get(config_url, headers=headers).json()
-            print(f"\n🖼️ Poster Sizes: {config_data['images']['poster_sizes']}")
+            elif choice == '4':
+                # Reference data: served from the cache, revalidated with a 304 at most once a day
+                print("\n⚙️ FETCHING API CONFIGURATIONS...")
+                # 1. Image Sizes
+                config_url = f"{BASE_URL}/configuration"
+                config_data = http_cache.get_json(config_url, headers=headers)
+                print(f"\n🖼️ Poster Sizes: {config_data['images']['poster_sizes']}")
 
-            # 2. Languages
-            lang_url = f"{BASE_URL}/configuration/languages"
-            lang_data = requests.get(lang_url, headers=headers).json()
-            print(f"🌎 Total Languages in Database: {len(lang_data)}")
+                # 2. Languages
+                lang_url = f"{BASE_URL}/configuration/languages"
+                lang_data = http_cache.get_json(lang_url, headers=headers)
+                print(f"🌎 Total Languages in Database: {len(lang_data)}")
 
-            # 3. Countries
-            country_url = f"{BASE_URL}/configuration/countries"
-            country_data = requests.get(country_url, headers=headers).json()
-            print(f"📍 Total Countries in Database: {len(country_data)}")
+                # 3. Countries
+                country_url = f"{BASE_URL}/configuration/countries"
+                country_data = http_cache.get_json(country_url, headers=headers)
+                print(f"📍 Total Countries in Database: {len(country_data)}")
 
-        elif choice == '5':
-            print("👋 Closing explorer. Happy hunting!")
-            break
+            elif choice == '5':
+                print("👋 Closing explorer. Happy hunting!")
+                break
         
-        else:
-            print("⚠️ Invalid choice. Please pick 1-5.")
+            else:
+                print("⚠️ Invalid choice. Please pick 1-5.")
+        except http_client.OfflineError as error:
+            # --offline: only what the pantry already holds can be shown
+            print(f"📴 {error}")
 
 # --- RUN THE APP ---
 if __name__ == "__main__":
+    telemetry.configure()
+    http_client.configure_offline()
     explore_database()
\ No newline at end of file
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import http_client
+import telemetry
+from title_index import normalize
+
+# ==========================================
+# ⚙️ 1. FEDERATED SEARCH CONFIG
+# ==========================================
+# One title query sent to TMDB and AniList at the same time. Hits are
+# normalized into one shape, hits naming the same title in the same year
+# (an animated film listed by both) are folded into one row, and the rest
+# is ranked together. The wait is bounded by the slower backend, and by
+# FEDERATED_TIMEOUT at most: a backend that hasn't answered by then is
+# reported as missing and the other one's hits are returned alone. Its
+# request keeps running and lands in the pantry for the next search.
+FEDERATED_TIMEOUT = float(os.getenv('FEDERATED_TIMEOUT', "4"))
+RESULTS_SHOWN = 15
+SOURCE_NAMES = {"tmdb": "TMDB", "anilist": "AniList"}
+
+# Ranking weights; every part is scaled to 0..1 first
+WEIGHTS = {"match": 0.55, "rating": 0.2, "popularity": 0.15, "both": 0.1}
+
+# Backend calls outlive a timed-out search, so the pool is never waited on
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="federated")
+
+class Hit:
+    """A title from one or both sources; `items` maps source -> its Movie / Anime record."""
+    __slots__ = ("title", "year", "names", "rating", "popularity", "items", "score")
+
+    def __init__(self, source, item, title, year, alt_titles, rating):
+        self.title = title
+        self.year = year
+        self.names = {name for name in map(normalize, [title, *alt_titles]) if name}
+        self.rating = rating or None     # 0..10; unrated TMDB titles report 0
+        self.popularity = 0.0            # percentile within its source, set by _rank_popularity()
+        self.items = {source: item}
+        self.score = 0.0
+
+    @property
+    def sources(self):
+        return list(self.items)
+
+    def absorb(self, other):
+        self.items.update(other.items)
+        self.names |= other.names
+        ratings = [r for r in (self.rating, other.rating) if r]
+        self.rating = sum(ratings) / len(ratings) if ratings else None
+        self.popularity = max(self.popularity, other.popularity)
+
+    def as_dict(self):
+        return {"title": self.title, "year": self.year, "rating": round(self.rating, 1) if self.rating else None,
+                "score": round(self.score, 4), "ids": {source: item.id for source, item in self.items.items()}}
+
+def movie_hit(movie):
+    year = movie.release_date[:4] if movie.release_date else ""
+    return Hit("tmdb", movie, movie.title, int(year) if year.isdigit() else None, [movie.original_title],
+               movie.vote_average)
+
+def anime_hit(anime):
+    return Hit("anilist", anime, anime.display_title, anime.seasonYear, [anime.romaji],
+               anime.averageScore / 10 if anime.averageScore else None)
+
+# ==========================================
+# 🔌 2. BACKENDS
+# ==========================================
+# Each takes (query, year) and returns Hits; both go through the pantry,
+# so a repeated query is answered without the network.
+def search_tmdb(query, year):
+    import app
+    return [movie_hit(m) for m in app.search_movie_list(query, year)]
+
+def search_anilist(query, year):
+    import anime_app
+    variables = {"search": query, "genre": None, "year": int(year) if year else None}
+    return [anime_hit(a) for a in anime_app.fetch_search_page(variables, 1)]
+
+BACKENDS = {"tmdb": search_tmdb, "anilist": search_anilist}
+
+# ==========================================
+# 🔀 3. MERGING & RANKING
+# ==========================================
+def _rank_popularity(hits, source):
+    """Popularity scales differ per source, so each hit gets its percentile within its own list."""
+    order = sorted(hits, key=lambda h: h.items[source].popularity or 0)
+    for position, hit in enumerate(order):
+        hit.popularity = position / (len(order) - 1) if len(order) > 1 else 1.0
+
+def merge(batches):
+    """Folds per-source hit lists into one, joining hits that share a normalized title and year.
+
+    Two hits from the same source are never joined (remakes can share a title
+    and a year across countries).
+    """
+    merged, by_key = [], {}
+    for hits in batches:
+        for hit in hits:
+            keys = [(name, hit.year) for name in hit.names]
+            target = next((by_key[key] for key in keys if key in by_key), None)
+            if target is None or target.items.keys() & hit.items.keys():
+                merged.append(hit)
+                target = hit
+            else:
+                target.absorb(hit)
+            for key in keys:
+                by_key.setdefault(key, target)
+    return merged
+
+def title_match(query, names):
+    """1.0 for an exact title, less for a prefix, a substring or shared words."""
+    words = set(query.split())
+    best = 0.0
+    for name in names:
+        if name == query:
+            return 1.0
+        if name.startswith(query):
+            best = max(best, 0.8)
+        elif query in name:
+            best = max(best, 0.6)
+        elif words:
+            best = max(best, 0.5 * len(words & set(name.split())) / len(words))
+    return best
+
+def rank(query, hits, year=None):
+    query = normalize(query)
+    for hit in hits:
+        hit.score = (WEIGHTS["match"] * title_match(query, hit.names) +
+                     WEIGHTS["rating"] * (hit.rating or 0) / 10 +
+                     WEIGHTS["popularity"] * hit.popularity +
+                     WEIGHTS["both"] * (len(hit.items) > 1))
+        if year and hit.year and str(hit.year) != str(year):
+            hit.score /= 2
+    return sorted(hits, key=lambda h: -h.score)
+
+# ==========================================
+# 🔎 4. FEDERATED SEARCH
+# ==========================================
+def federated_search(query, year=None, timeout=FEDERATED_TIMEOUT, backends=None):
+    """Queries every backend concurrently; returns (ranked Hits, {source: why it is missing}).
+
+    A backend that fails or misses the timeout only drops its own hits.
+    """
+    backends = backends or BACKENDS
+    with telemetry.span("federated_search", sources=",".join(backends)) as span:
+        futures = {source: _pool.submit(search, query, year) for source, search in backends.items()}
+        wait(futures.values(), timeout=timeout)
+        batches, missing = [], {}
+        for source, future in futures.items():
+            if future.done() and future.exception() is None:
+                hits = future.result()
+                _rank_popularity(hits, source)
+                batches.append(hits)
+            elif not future.done():
+                missing[source] = "timed out"
+                telemetry.count("federated_missing_total", source=source, reason="timeout")
+            else:
+                error = future.exception()
+                missing[source] = f"failed ({type(error).__name__}: {error})"
+                telemetry.count("federated_missing_total", source=source, reason="error")
+        span.set(missing=",".join(missing))
+    return rank(query, merge(batches), year), missing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search TMDB and AniList at once.")
+    parser.add_argument("query", nargs="?", help="title to look for (prompted if left out)")
+    parser.add_argument("--year", help="prefer titles from this year")
+    parser.add_argument("--timeout", type=float, default=FEDERATED_TIMEOUT, help="seconds to wait for the slower source")
+    parser.add_argument("--count", type=int, default=RESULTS_SHOWN)
+    parser.add_argument("--trace", action="store_true", help="write trace.jsonl / metrics.prom (see telemetry.py)")
+    parser.add_argument("--offline", action="store_true", help="answer from the pantry only, expired entries included")
+    args = parser.parse_args(argv)
+    if args.trace:
+        telemetry.enable()
+    if args.offline:
+        http_client.set_offline()
+    query = args.query or input("🔎 Movie or anime title: ").strip()
+    if not query:
+        return 1
+
+    started = time.perf_counter()
+    hits, missing = federated_search(query, args.year, args.timeout)
+    print(f"\n🔎 '{query}' on {' + '.join(SOURCE_NAMES.values())} ({time.perf_counter() - started:.2f}s)")
+    print("-" * 40)
+    for i, hit in enumerate(hits[:args.count], 1):
+        rating = f"⭐ {hit.rating:.1f}" if hit.rating else ""
+        found_in = " + ".join(SOURCE_NAMES[source] for source in hit.sources)
+        print(f"{i:>2}. {hit.title} ({hit.year or '????'})  [{found_in}]  {rating}")
+    if not hits:
+        print("No matches.")
+    for source, reason in missing.items():
+        print(f"⚠️ {SOURCE_NAMES[source]} {reason}; showing the other results only.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
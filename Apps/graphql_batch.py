@@ -0,0 +1,278 @@
+import re
+import json
+import threading
+from concurrent.futures import Future
+
+import http_client
+import rate_limit
+import telemetry
+
+# ==========================================
+# 🧩 1. DOCUMENT MERGING
+# ==========================================
+# Several GraphQL operations can travel in one POST if they are merged into
+# a single document: every top-level field gets an alias prefixed with the
+# operation's slot ("b0_", "b1_", ...) and every variable gets the matching
+# suffix, so nothing collides. The response is then split back by prefix.
+# Only plain `query` operations are merged; anything the splitter does not
+# understand (fragments, mutations) is sent on its own.
+_VARIABLE = re.compile(r"\$(\w+)")
+_OPERATION_NAME = re.compile(r"\s*query\s+(\w+)")
+_NAME = re.compile(r"[_A-Za-z]\w*")
+
+def _matching(text, start, open_char, close_char):
+    """Index just past the bracket that closes the one at `start`, skipping strings."""
+    depth, i, in_string = 0, start, False
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_char:
+            depth += 1
+        elif ch == close_char:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError("Unbalanced GraphQL document")
+
+def parse_operation(query):
+    """Splits a query into (variable definitions, [(response key, field text without alias)])."""
+    text = query.strip()
+    body_start = text.index("{")
+    header = text[:body_start].strip()
+    if header and not header.startswith("query"):
+        raise ValueError("Only query operations can be batched")
+    var_defs = ""
+    if "(" in header:
+        open_at = text.index("(")
+        var_defs = text[open_at + 1:_matching(text, open_at, "(", ")") - 1].strip()
+
+    body = text[body_start + 1:_matching(text, body_start, "{", "}") - 1]
+    if "..." in body:
+        raise ValueError("Fragments can't be batched")
+
+    selections, i = [], 0
+    while i < len(body):
+        match = _NAME.match(body, i)
+        if not match:
+            i += 1
+            continue
+        field_start, key, i = i, match.group(), match.end()
+        if body[i:].lstrip().startswith(":"):
+            i = body.index(":", i) + 1
+            while body[i].isspace():
+                i += 1
+            field_start, i = i, _NAME.match(body, i).end()
+        while i < len(body) and body[i].isspace():
+            i += 1
+        if i < len(body) and body[i] == "(":
+            i = _matching(body, i, "(", ")")
+            while i < len(body) and body[i].isspace():
+                i += 1
+        if i < len(body) and body[i] == "{":
+            i = _matching(body, i, "{", "}")
+        selections.append((key, body[field_start:i].strip()))
+    return var_defs, selections
+
+def merge_operations(operations):
+    """Returns (document, variables, key maps) for [(query, variables), ...]."""
+    all_defs, all_fields, all_vars, key_maps = [], [], {}, []
+    for slot, (query, variables) in enumerate(operations):
+        var_defs, selections = parse_operation(query)
+        suffix = f"_b{slot}"
+        if var_defs:
+            all_defs.append(_VARIABLE.sub(lambda m: f"${m.group(1)}{suffix}", var_defs))
+        key_map = {}
+        for key, field in selections:
+            alias = f"b{slot}_{key}"
+            key_map[alias] = key
+            all_fields.append(f"{alias}: {_VARIABLE.sub(lambda m: f'${m.group(1)}{suffix}', field)}")
+        for name, value in (variables or {}).items():
+            all_vars[f"{name}{suffix}"] = value
+        key_maps.append(key_map)
+
+    header = f"query ({', '.join(all_defs)})" if all_defs else "query"
+    document = header + " {\n  " + "\n  ".join(all_fields) + "\n}"
+    return document, all_vars, key_maps
+
+def split_response(payload, key_maps):
+    """Turns one merged response back into a {'data', 'errors'} result per operation.
+
+    An error that names no field of the merged document (no path) concerns
+    the whole request, so every operation gets it.
+    """
+    data = payload.get('data') or {}
+    results = [{'data': {}} for _ in key_maps]
+    owner = {alias: slot for slot, key_map in enumerate(key_maps) for alias in key_map}
+    for slot, key_map in enumerate(key_maps):
+        for alias, key in key_map.items():
+            results[slot]['data'][key] = data.get(alias)
+    for error in payload.get('errors') or []:
+        path = error.get('path') or []
+        slot = owner.get(path[0]) if path else None
+        if slot is None:
+            for result in results:
+                result.setdefault('errors', []).append(error)
+            continue
+        error = dict(error, path=[key_maps[slot][path[0]]] + list(path[1:]))
+        results[slot].setdefault('errors', []).append(error)
+    return results
+
+def operation_name(query):
+    """`query AnimeSearchList (...)` -> "AnimeSearchList"; unnamed operations use their first field."""
+    match = _OPERATION_NAME.match(query)
+    if match:
+        return match.group(1)
+    selections = parse_operation(query)[1]
+    return selections[0][0] if selections else "anonymous"
+
+def _record_size(query, result):
+    # Bytes per operation, even when several shared one POST (http_response_bytes_total counts whole requests)
+    if telemetry.enabled:
+        name = operation_name(query)
+        telemetry.count("graphql_responses_total", operation=name)
+        telemetry.count("graphql_response_bytes_total", len(json.dumps(result.get('data'))), operation=name)
+
+# ==========================================
+# 📦 2. BATCHER
+# ==========================================
+BATCH_WINDOW = 0.015    # seconds to wait for more operations
+MAX_BATCH = 5           # AniList also limits query complexity, so keep batches small
+
+class GraphQLBatcher:
+    def __init__(self, url, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.url = url
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []     # [(query, variables, Future, priority)]
+        self._in_flight = {}   # (query, variables as JSON) -> Future, until it resolves
+        self._timer = None
+        self._lock = threading.Lock()
+        self.coalesced = 0     # submits answered by an identical operation already queued or sent
+
+    def submit(self, query, variables=None):
+        """Queues an operation; the Future resolves to {'data': ..., 'errors': [...]}.
+
+        An identical operation that is still queued or in flight is not sent
+        again: its Future is returned and the result shared (read-only).
+        """
+        key = (query, json.dumps(variables, sort_keys=True))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                if telemetry.enabled:
+                    telemetry.count("graphql_coalesced_total", operation=operation_name(query))
+                return future
+            future = self._in_flight[key] = Future()
+            future.add_done_callback(lambda _: self._forget(key))
+            self._pending.append((query, variables, future, rate_limit.current_priority()))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._send(batch)
+        return future
+
+    def execute(self, query, variables=None):
+        return self.submit(query, variables).result()
+
+    def _forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def execute_many(self, operations):
+        """Sends [(query, variables), ...] together without waiting for the window."""
+        futures = [Future() for _ in operations]
+        priority = rate_limit.current_priority()
+        batch = [(query, variables, future, priority) for (query, variables), future in zip(operations, futures)]
+        for start in range(0, len(batch), self.max_batch):
+            self._send(batch[start:start + self.max_batch])
+        return [future.result() for future in futures]
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch):
+        if len(batch) == 1:
+            self._send_single(*batch[0])
+            return
+        try:
+            document, variables, key_maps = merge_operations([(q, v) for q, v, _, _ in batch])
+        except ValueError:
+            for operation in batch:
+                self._send_single(*operation)
+            return
+
+        try:
+            payload, status = self._post(document, variables, min(p for _, _, _, p in batch))
+        except Exception as e:
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        if payload.get('data') is None:
+            if status == 429 or status >= 500:
+                # Rate limited (after http_client's retries) or the server is down:
+                # sending each operation again would only add load, so all share the error
+                errors = payload.get('errors') or [{'message': f"HTTP {status}", 'status': status}]
+                for _, _, future, _ in batch:
+                    future.set_result({'data': None, 'errors': errors})
+                return
+            # The merged document was rejected as a whole; retry each operation
+            # so every caller gets its own errors.
+            for operation in batch:
+                self._send_single(*operation)
+            return
+        for (query, _, future, _), result in zip(batch, split_response(payload, key_maps)):
+            _record_size(query, result)
+            future.set_result(result)
+
+    def _send_single(self, query, variables, future, priority):
+        try:
+            result, _ = self._post(query, variables, priority)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        _record_size(query, result)
+        future.set_result(result)
+
+    def _post(self, query, variables, priority):
+        """Returns (decoded payload, HTTP status)."""
+        response = http_client.post(self.url, json={'query': query, 'variables': variables}, priority=priority)
+        try:
+            return response.json(), response.status_code
+        except ValueError:
+            response.raise_for_status()
+            raise
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(url):
+    """Shared batcher per GraphQL endpoint."""
+    with _batchers_lock:
+        if url not in _batchers:
+            _batchers[url] = GraphQLBatcher(url)
+        return _batchers[url]
@@ -1,18 +1,29 @@
+import startup  # first, so the startup clock includes every other import
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
-import requests
+import http_client
+import http_cache
 import os
+import json
 import webbrowser
 from dotenv import load_dotenv
-from PIL import Image, ImageTk
-from io import BytesIO
+from pantry import get_pantry, serve_stale, SEARCH_TTL
+from background import BackgroundFetcher, update_rows
+from autocomplete import Autocompleter
+import movie_details
+from pager import paginate, tmdb_page_fetcher
+from poster_cache import PosterCache, pick_poster_size, DEFAULT_POSTER_SIZES
+from title_index import get_title_index, tmdb_titles
+from watchlist import get_watchlist, SAVED_MARK
+from records import Movie, decode_movies
+import telemetry
 
 # ==========================================
 # ⚙️ 1. INITIAL SETUP & API CONFIG
 # ==========================================
 load_dotenv()
 API_TOKEN = os.getenv('TMDB_TOKEN')
-BASE_URL = "https://api.themoviedb.org/3"
+BASE_URL = os.getenv('BASE_URL', "https://api.themoviedb.org/3")
 headers = {"accept": "application/json", "Authorization": f"Bearer {API_TOKEN}"}
 
 GENRES = {
@@ -24,6 +35,16 @@ GENRES = {
 }
 GENRE_NAMES = {v: k.capitalize() for k, v in GENRES.items()}
 
+RESULTS_SHOWN = 15
+
+def get_image_config():
+    """Image base URL and poster sizes from /configuration (revalidated at most daily, see http_cache)."""
+    try:
+        config = http_cache.get_json(f"{BASE_URL}/configuration", headers=headers)
+        return config['images']['secure_base_url'], config['images']['poster_sizes']
+    except Exception:
+        return "https://image.tmdb.org/t/p/", DEFAULT_POSTER_SIZES
+
 class MovieEngineGUI:
     def __init__(self, root):
         self.root = root
@@ -33,6 +54,16 @@ class MovieEngineGUI:
         
         self.current_results = []
         self.base_genre_ids = []
+        self.fetcher = BackgroundFetcher(root)
+        self.posters = PosterCache()
+        self.details = movie_details.DetailLoader(BASE_URL, headers)
+        self.autocomplete = Autocompleter(root, self.fetcher, self.fetch_suggestions, self.show_suggestions,
+                                          on_clear=lambda: self.suggestion_menu.unpost(),
+                                          local=self.local_suggestions)
+        # The local title index loads on a worker so a large one doesn't hold up the window
+        self.titles = None
+        self.fetcher.submit("titles", get_title_index, "tmdb", on_done=lambda index: setattr(self, 'titles', index))
+        self.watchlist = get_watchlist()
 
         # ==========================================
         # 🏗️ 2. DRAGGABLE PANED WINDOW
@@ -118,117 +149,236 @@ class MovieEngineGUI:
         setattr(self, var_name, entry)
 
     def on_type_suggestion(self, *args):
-        text = self.movie_text_var.get()
-        if len(text) < 3:
-            self.suggestion_menu.unpost()
-            return
-        
-        try:
-            params = {"query": text}
-            resp = requests.get(f"{BASE_URL}/search/movie", headers=headers, params=params).json()
-            results = resp.get('results', [])[:5]
-            if results:
-                self.suggestion_menu.delete(0, tk.END)
-                for movie in results:
-                    name = movie['title']
-                    self.suggestion_menu.add_command(label=name, command=lambda n=name: self.select_suggestion(n))
-                
-                x = self.entry_movie.winfo_rootx()
-                y = self.entry_movie.winfo_rooty() + self.entry_movie.winfo_height()
-                self.suggestion_menu.post(x, y)
-        except: pass
+        # Debounced + cached; lookup failures are ignored since suggestions are a nice-to-have
+        self.autocomplete.on_text(self.movie_text_var.get())
+
+    def local_suggestions(self, text, limit):
+        return self.titles.suggest(text, limit) if self.titles else []
+
+    def fetch_suggestions(self, text):
+        return [movie.title for movie in self.search_hits(text)]
+
+    def show_suggestions(self, names):
+        if not names: return
+        self.suggestion_menu.delete(0, tk.END)
+        for name in names:
+            self.suggestion_menu.add_command(label=name, command=lambda n=name: self.select_suggestion(n))
+
+        x = self.entry_movie.winfo_rootx()
+        y = self.entry_movie.winfo_rooty() + self.entry_movie.winfo_height()
+        self.suggestion_menu.post(x, y)
 
     def select_suggestion(self, name):
         self.movie_text_var.set(name)
+        self.autocomplete.cancel()
         self.suggestion_menu.unpost()
 
     # ==========================================
     # 🔎 6. SEARCH & SELECTION LOGIC
     # ==========================================
+    # fetch_* methods run on worker threads and must not touch widgets;
+    # show_* methods are their callbacks on the Tk loop.
     def perform_search(self):
         fav_movie = self.entry_movie.get()
         year_filter = self.entry_year.get()
         theme_input = self.entry_theme.get().lower()
         target_genre_id = GENRES.get(theme_input)
 
-        try:
-            if fav_movie:
-                s_res = requests.get(f"{BASE_URL}/search/movie", headers=headers, params={"query": fav_movie}).json()
-                if not s_res.get('results'): return
-                base_movie = s_res['results'][0]
-                self.base_genre_ids = base_movie.get('genre_ids', [])
-                recs = requests.get(f"{BASE_URL}/movie/{base_movie['id']}/recommendations", headers=headers).json().get('results', [])
-                
-                self.current_results = [m for m in recs if base_movie['title'].lower() not in m['title'].lower()]
-                if not self.current_results: self.current_results = recs
-            else:
-                params = {"primary_release_year": year_filter, "with_genres": target_genre_id, "sort_by": "popularity.desc"}
-                res = requests.get(f"{BASE_URL}/discover/movie", headers=headers, params=params).json()
-                self.current_results = res.get('results', [])
-
-            self.results_list.delete(0, tk.END)
-            for m in self.current_results[:15]:
-                self.results_list.insert(tk.END, f" {m['title']} ({m.get('release_date', '????')[:4]})")
-            
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self.fetcher.cancel("detail")
+        self.fetcher.cancel("refresh")
+        self.current_results = []
+        self.results_list.delete(0, tk.END)
+        self.results_list.insert(tk.END, " Searching...")
+        self.fetcher.submit("search", serve_stale, self.fetch_results, fav_movie, year_filter, target_genre_id,
+                            on_done=self.show_served, on_error=self.show_search_error)
+
+    def search_hits(self, query):
+        """/search/movie hits as Movie records. Suggestions and searches share the cache entry,
+        so searching for a title the autocomplete just looked up costs no request."""
+        def fetch():
+            response = http_client.get(f"{BASE_URL}/search/movie", headers=headers, params={"query": query})
+            response.raise_for_status()     # an error body must not be cached as "no hits"
+            return {"results": [Movie.from_api(raw).to_row() for raw in response.json().get('results', [])]}
+
+        s_res = get_pantry().get_or_fetch(f"tmdb:search:{query.lower()}", fetch, ttl=SEARCH_TTL)
+        hits = decode_movies(s_res.get('results'))
+        get_title_index("tmdb").add_many(tmdb_titles(hits))
+        return hits
+
+    def fetch_results(self, fav_movie, year_filter, target_genre_id):
+        if fav_movie:
+            hits = self.search_hits(fav_movie)
+            if not hits: return [], []
+            base_movie = hits[0]
+            base_title = base_movie.title_lower
+            # Page deeper while sequels leave the list short of RESULTS_SHOWN
+            fetch_page = tmdb_page_fetcher(f"{BASE_URL}/movie/{base_movie.id}/recommendations", headers,
+                                           cache_key=f"tmdb:recs:{base_movie.id}", ttl=None)
+            recs = list(paginate(fetch_page, keep=lambda m: base_title not in m.title_lower,
+                                 want=RESULTS_SHOWN, max_pages=3))
+
+            get_title_index("tmdb").add_many(tmdb_titles(recs))
+
+            results = [m for m in recs if base_title not in m.title_lower]
+            return results or recs, base_movie.genre_ids
+
+        # NumPy (behind the catalog) is loaded on this worker the first time discover runs
+        from catalog_index import local_first
+        params = {"primary_release_year": year_filter, "with_genres": target_genre_id, "sort_by": "popularity.desc"}
+        # The offline catalog (if one was ingested) answers first; TMDB only on a miss
+        fetch_page = local_first(tmdb_page_fetcher(f"{BASE_URL}/discover/movie", headers, params,
+                                                   cache_key=f"tmdb:discover-list:{json.dumps(params, sort_keys=True)}"), params)
+        results = list(paginate(fetch_page, want=RESULTS_SHOWN))
+        get_title_index("tmdb").add_many(tmdb_titles(results))
+        return results, []
+
+    def result_label(self, movie):
+        saved = f" {SAVED_MARK}" if self.watchlist.contains("tmdb", movie.id) else ""
+        return f" {movie.title} ({movie.get('release_date', '????')[:4]}){saved}"
+
+    def show_served(self, served):
+        # Cached results show at once; if some were stale, the refreshed ones follow
+        payload, refresh = served
+        self.show_results(payload)
+        if refresh:
+            self.fetcher.submit("refresh", refresh, on_done=self.refresh_results)
 
+    def show_results(self, payload):
+        self.current_results, self.base_genre_ids = payload
+        self.results_list.delete(0, tk.END)
+        for m in self.current_results[:RESULTS_SHOWN]:
+            self.results_list.insert(tk.END, self.result_label(m))
+        # Warm the detail cache for the rows most likely to be clicked
+        self.details.prefetch([m.id for m in self.current_results])
+
+    def refresh_results(self, payload):
+        """Fresh data for the listed search: only changed rows are redrawn and the selected movie stays selected."""
+        if payload is None:
+            return
+        selected = [self.current_results[i].id for i in self.results_list.curselection()
+                    if i < len(self.current_results)]
+        self.current_results, self.base_genre_ids = payload
+        update_rows(self.results_list, [self.result_label(m) for m in self.current_results[:RESULTS_SHOWN]])
+        for row, movie in enumerate(self.current_results[:RESULTS_SHOWN]):
+            if movie.id in selected:
+                self.results_list.selection_set(row)
+        self.details.prefetch([m.id for m in self.current_results])
+
+    def show_search_error(self, error):
+        self.results_list.delete(0, tk.END)
+        messagebox.showerror("Error", str(error))
+
+    @telemetry.traced("ui_select")
     def on_select_movie(self, event):
         if not self.results_list.curselection(): return
         index = self.results_list.curselection()[0]
+        if index >= len(self.current_results): return
         movie = self.current_results[index]
 
         self.detail_area.delete('1.0', tk.END)
         for widget in self.action_frame.winfo_children(): widget.destroy()
 
-        # Fetch Trailer
-        v_res = requests.get(f"{BASE_URL}/movie/{movie['id']}/videos", headers=headers).json()
-        trailer_key = next((v['key'] for v in v_res.get('results', []) if v['type'] == 'Trailer'), None)
-        
-        # Poster Image
-        if movie.get('poster_path'):
-            img_url = f"https://image.tmdb.org/t/p/w300{movie['poster_path']}"
-            response = requests.get(img_url)
-            img_data = Image.open(BytesIO(response.content))
-            photo = ImageTk.PhotoImage(img_data)
-            self.poster_label.config(image=photo)
-            self.poster_label.image = photo 
+        # Poster: a memory-cache hit shows instantly, otherwise a placeholder until the worker decodes it
+        box = self.poster_box()
+        poster_key = (movie.poster_path, box) if movie.poster_path else None
+        photo = self.posters.get_photo(poster_key) if poster_key else None
+        if photo:
+            self.poster_label.config(image=photo, text="")
+        else:
+            self.poster_label.config(image="", text="Loading poster..." if poster_key else "", fg="#bbb")
+        self.poster_label.image = photo
 
         # Reasons
-        matched = [GENRE_NAMES[g_id] for g_id in movie.get('genre_ids', []) if g_id in self.base_genre_ids]
+        matched = [GENRE_NAMES[g_id] for g_id in movie.genre_ids if g_id in self.base_genre_ids]
         reason_text = f"💡 REASON: Shared Genres ({', '.join(matched)})\n\n" if matched else ""
 
         # Render Content
-        self.detail_area.insert(tk.END, f"{movie['title'].upper()}\n", "title")
+        self.detail_area.insert(tk.END, f"{movie.title.upper()}\n", "title")
         self.detail_area.insert(tk.END, reason_text, "reason")
-        self.detail_area.insert(tk.END, f"Rating: {movie['vote_average']}/10\n\n")
+        self.detail_area.insert(tk.END, f"Rating: {movie.vote_average}/10\n\n")
         self.detail_area.insert(tk.END, movie.get('overview', 'No description.'))
         
         self.detail_area.tag_config("title", font=("Arial", 20, "bold"), foreground="#7FA2EC")
         self.detail_area.tag_config("reason", font=("Arial", 11, "italic"), foreground="#bbb")
 
-        # Buttons
+        # Buttons (the trailer button joins once /videos answers)
+        self.save_btn = tk.Button(self.action_frame, text="SAVE TO WATCHLIST", bg="#FFD700", fg="#1a1a1a", font=("Arial", 10, "bold"),
+                                  command=lambda: self.save_to_file(movie))
+        self.save_btn.pack(side="left", padx=10, expand=True)
+
+        self.fetcher.submit("detail", self.fetch_details, movie, None if photo else poster_key,
+                            on_done=self.show_details, on_error=self.show_detail_error)
+
+    def poster_box(self):
+        # The poster gets a bit over half of the display height (300x450 in the default window)
+        height = max(self.right_frame.winfo_height() * 53 // 100, 231)
+        return (height * 2 // 3, height)
+
+    def fetch_details(self, movie, poster_key):
+        # Fetch Trailer (details come with videos appended, often already prefetched)
+        trailer_key = movie_details.trailer_key(self.details.get(movie.id))
+
+        # Poster Image (decoded here; PhotoImage itself must be built on the Tk thread)
+        img_data = None
+        if poster_key:
+            poster_path, box = poster_key
+            image_base, poster_sizes = get_image_config()
+            img_url = f"{image_base}{pick_poster_size(poster_sizes, box[0])}{poster_path}"
+            img_data = self.posters.load_image(img_url, box)
+        return trailer_key, poster_key, img_data
+
+    def show_details(self, details):
+        trailer_key, poster_key, img_data = details
+        if img_data:
+            photo = self.posters.put_photo(poster_key, img_data)
+            self.poster_label.config(image=photo, text="")
+            self.poster_label.image = photo
+
         if trailer_key:
             tk.Button(self.action_frame, text="WATCH TRAILER", bg="#DA1C1C", fg="white", font=("Arial", 10, "bold"),
-                      command=lambda: webbrowser.open(f"https://www.youtube.com/watch?v={trailer_key}")).pack(side="left", padx=10, expand=True)
-        
-        tk.Button(self.action_frame, text="SAVE TO WATCHLIST", bg="#FFD700", fg="#1a1a1a", font=("Arial", 10, "bold"),
-                  command=lambda: self.save_to_file(movie)).pack(side="left", padx=10, expand=True)
+                      command=lambda: webbrowser.open(f"https://www.youtube.com/watch?v={trailer_key}")).pack(side="left", padx=10, expand=True, before=self.save_btn)
+
+    def show_detail_error(self, error):
+        self.poster_label.config(text="Poster unavailable")
+
+    def import_watchlist(self):
+        # Lines still in the old watchlist.txt are matched to TMDB IDs once, in the background
+        self.fetcher.submit("watchlist", self.watchlist.import_text, "tmdb", self.resolve_title)
+
+    def resolve_title(self, title, year):
+        params = {"query": title, "primary_release_year": year}
+        response = http_client.get(f"{BASE_URL}/search/movie", headers=headers, params=params)
+        response.raise_for_status()     # a failed lookup must not look like "no match"
+        resp = response.json()
+        return resp['results'][0] if resp.get('results') else None
 
     def save_to_file(self, movie):
-        with open("watchlist.txt", "a", encoding="utf-8") as f:
-            f.write(f"{movie['title']} ({movie.get('release_date', '????')[:4]})\n")
-        messagebox.showinfo("Saved", f"'{movie['title']}' added to watchlist!")
+        if not self.watchlist.add("tmdb", movie):
+            messagebox.showinfo("Saved", f"'{movie.title}' is already in your watchlist.")
+            return
+        # Mark the row in place (by ID: a background refresh may have swapped in new records)
+        rows = [m.id for m in self.current_results[:RESULTS_SHOWN]]
+        if movie.id in rows:
+            row = rows.index(movie.id)
+            self.results_list.delete(row)
+            self.results_list.insert(row, self.result_label(movie))
+        messagebox.showinfo("Saved", f"'{movie.title}' added to watchlist!")
 
 # ==========================================
 # 🚀 7. BOOTSTRAP
 # ==========================================
 def main():
+    telemetry.configure()
+    http_client.configure_offline()
     root = tk.Tk()
     app = MovieEngineGUI(root)
+    telemetry.watch_tk(root)
+    # The watchlist import makes requests, so it waits until the window is up
+    startup.window_ready(root, app.fetcher, ("catalog_index",), deferred=(app.import_watchlist,))
     root.mainloop()
+    # Set AUTOCOMPLETE_STATS=1 to print cache hit rates when tuning the debounce window
+    if os.getenv('AUTOCOMPLETE_STATS'):
+        print(f"⌨️ Autocomplete stats: {app.autocomplete.stats()}")
 
 if __name__ == "__main__":
-    import hupper
-    reloader = hupper.start_reloader('gui_app.main') 
-    main()
\ No newline at end of file
+    startup.launch("gui_app", main)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import re
+import time
+from urllib.parse import urlencode
+
+import http_client
+import telemetry
+from pantry import get_pantry
+
+# ==========================================
+# 🗂️ REFERENCE DATA CACHE
+# ==========================================
+# Genre lists, /configuration, languages and countries change a few times
+# a year. Responses are kept in the pantry together with their validators:
+#   * within FRESH_FOR (or the server's Cache-Control max-age, if longer)
+#     they are served with no request at all
+#   * after that they are revalidated with If-None-Match / If-Modified-Since,
+#     so an unchanged resource costs one empty 304
+#   * responses that carry no validators just stay fresh for NO_VALIDATOR_TTL
+# A cached copy is also served when revalidation fails (offline, 5xx).
+FRESH_FOR = 24 * 3600
+NO_VALIDATOR_TTL = 30 * 24 * 3600
+KEEP_FOR = 180 * 24 * 3600
+
+def _max_age(headers):
+    match = re.search(r"max-age=(\d+)", headers.get('Cache-Control', ""))
+    return int(match.group(1)) if match else None
+
+def get_json(url, headers=None, params=None, fresh_for=FRESH_FOR):
+    """GET `url` as JSON through the reference cache."""
+    key = f"http:{url}?{urlencode(sorted((params or {}).items()))}"
+    pantry = get_pantry()
+    entry = pantry.get(key)
+    now = time.time()
+    if entry and now < entry['fresh_until']:
+        telemetry.count("cache_requests_total", cache="reference", result="fresh")
+        return entry['body']
+
+    request_headers = dict(headers or {})
+    if entry and entry.get('etag'):
+        request_headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        request_headers['If-Modified-Since'] = entry['last_modified']
+    try:
+        response = http_client.get(url, headers=request_headers, params=params)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except Exception:
+        if entry:
+            telemetry.count("cache_requests_total", cache="reference", result="stale")
+            return entry['body']
+        raise
+
+    if response.status_code == 304 and entry:
+        telemetry.count("cache_requests_total", cache="reference", result="revalidated")
+        body = entry['body']
+    else:
+        telemetry.count("cache_requests_total", cache="reference", result="miss")
+        body = response.json()
+
+    etag = response.headers.get('ETag') or (entry or {}).get('etag')
+    last_modified = response.headers.get('Last-Modified') or (entry or {}).get('last_modified')
+    fresh = max(_max_age(response.headers) or 0, fresh_for if etag or last_modified else NO_VALIDATOR_TTL)
+    pantry.put(key, {"body": body, "etag": etag, "last_modified": last_modified, "fresh_until": now + fresh},
+               ttl=KEEP_FOR)
+    return body
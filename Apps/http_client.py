@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from urllib.parse import urlsplit, parse_qsl
+
+import rate_limit
+import telemetry
+
+# ==========================================
+# ⚙️ 1. POOL & TIMEOUT CONFIG
+# ==========================================
+# Every app talks to the same three hosts. Instead of opening a fresh
+# TCP+TLS connection per call, each host gets one keep-alive Session
+# whose pool is reused by every module in the suite.
+DEFAULT_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HOST_POOL_SIZES = {
+    "api.themoviedb.org": DEFAULT_POOL_SIZE,
+    "image.tmdb.org": 6,
+    "graphql.anilist.co": 4,
+}
+
+# (connect, read) timeouts in seconds. The first fragment found in the URL wins.
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    "/search/": (3.05, 5),
+    "/configuration": (3.05, 5),
+    "/genre/": (3.05, 5),
+    "image.tmdb.org": (3.05, 15),
+    "graphql.anilist.co": (3.05, 10),
+}
+
+# Offline mode (DISCOVERY_OFFLINE=1 or --offline): no request leaves the
+# machine. The pantry serves whatever it holds, expired entries included,
+# and anything it doesn't hold fails with OfflineError.
+OFFLINE = os.getenv('DISCOVERY_OFFLINE', "") not in ("", "0")
+
+class OfflineError(ConnectionError):
+    pass
+
+# None = any host. The benchmark pins every request to its local servers;
+# a request elsewhere fails with HostNotAllowed and is counted in blocked.
+ALLOWED_HOSTS = None
+blocked = Counter()     # host -> refused requests
+
+class HostNotAllowed(ConnectionError):
+    pass
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# ==========================================
+# 🔌 2. SESSION POOL
+# ==========================================
+def get_session(url):
+    """Returns the shared keep-alive Session for the host of `url`."""
+    parts = urlsplit(url)
+    host_key = f"{parts.scheme}://{parts.netloc}"
+    session = _sessions.get(host_key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host_key)
+        if session is None:
+            # requests (with urllib3 and certifi) is imported on first use, not at app start
+            import requests
+            from requests.adapters import HTTPAdapter
+            pool_size = HOST_POOL_SIZES.get(parts.hostname, DEFAULT_POOL_SIZE)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount(host_key, adapter)
+            _sessions[host_key] = session
+    return session
+
+def timeout_for(url):
+    for fragment, timeout in ENDPOINT_TIMEOUTS.items():
+        if fragment in url:
+            return timeout
+    return DEFAULT_TIMEOUT
+
+def configure(pool_sizes=None, timeouts=None, allowed_hosts=None):
+    """Overrides pool sizes / timeouts / allowed hosts. Pools already opened keep their size."""
+    global ALLOWED_HOSTS
+    if pool_sizes:
+        HOST_POOL_SIZES.update(pool_sizes)
+    if timeouts:
+        ENDPOINT_TIMEOUTS.update(timeouts)
+    if allowed_hosts is not None:
+        ALLOWED_HOSTS = frozenset(allowed_hosts)
+
+def set_offline(offline=True):
+    global OFFLINE
+    OFFLINE = offline
+
+def configure_offline(argv=None):
+    """Turns offline mode on if --offline is among `argv` (default sys.argv)."""
+    if "--offline" in (sys.argv if argv is None else argv):
+        set_offline(True)
+
+def close_all():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+# ==========================================
+# 🌐 3. REQUEST HELPERS
+# ==========================================
+# 429s are retried after the limiter's pause; the last 429 is returned to the caller
+MAX_RATE_LIMIT_RETRIES = 2
+failed = Counter()      # (host, status) -> error responses returned to callers, after retries
+
+def request(method, url, priority=None, **kwargs):
+    """Sends through the host's pool, waiting for its rate limiter first (see rate_limit.py).
+
+    A request identical to one already in flight shares its response (see section 4).
+    """
+    if OFFLINE:
+        raise OfflineError(f"Offline: {telemetry.endpoint(url)} is not cached")
+    if ALLOWED_HOSTS is not None and urlsplit(url).hostname not in ALLOWED_HOSTS:
+        blocked[urlsplit(url).hostname] += 1
+        raise HostNotAllowed(f"{urlsplit(url).hostname} is not an allowed host")
+    if not COALESCE or kwargs.get('stream'):
+        return _request(method, url, priority, **kwargs)
+
+    if priority is None:
+        priority = rate_limit.current_priority()
+    key = flight_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'), kwargs.get('headers'))
+    host = urlsplit(url).hostname
+    with _flights_lock:
+        flight, leader_priority = _flights.get(key, (None, None))
+        # Never wait behind a request the limiter lets lower-priority work jump ahead of
+        leader = flight is None or leader_priority > priority
+        if leader:
+            flight = Future()
+            _flights[key] = (flight, priority)
+        _flight_counts[host, "sent" if leader else "coalesced"] += 1
+    if not leader:
+        return flight.result()
+
+    try:
+        response = _request(method, url, priority, **kwargs)
+        response.content    # read the body now, so every waiter can parse it
+    except BaseException as error:
+        flight.set_exception(error)
+        raise
+    else:
+        flight.set_result(response)
+        return response
+    finally:
+        with _flights_lock:
+            if _flights.get(key, (None,))[0] is flight:
+                del _flights[key]
+
+def _request(method, url, priority, **kwargs):
+    response = _traced_send(method, url, priority, **kwargs)
+    if response.status_code >= 400:
+        failed[urlsplit(url).hostname, response.status_code] += 1
+    return response
+
+def _traced_send(method, url, priority, **kwargs):
+    if not telemetry.enabled:
+        return _send(method, url, priority, **kwargs)
+    with telemetry.span("http_request", method=method, endpoint=telemetry.endpoint(url)) as span:
+        response = _send(method, url, priority, **kwargs)
+        size = len(response.content) if not kwargs.get('stream') else int(response.headers.get('Content-Length') or 0)
+        span.set(status=response.status_code, bytes=size)
+    telemetry.count("http_requests_total", host=urlsplit(url).hostname, status=response.status_code)
+    telemetry.count("http_response_bytes_total", size, host=urlsplit(url).hostname)
+    return response
+
+def _send(method, url, priority, **kwargs):
+    kwargs.setdefault('timeout', timeout_for(url))
+    session = get_session(url)
+    limiter = rate_limit.limiter_for(url)
+    if limiter is None:
+        return session.request(method, url, **kwargs)
+
+    if priority is None:
+        priority = rate_limit.current_priority()
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        with telemetry.span("rate_limit_wait", priority=priority):
+            limiter.acquire(priority)
+        response = session.request(method, url, **kwargs)
+        limiter.observe(response.status_code, response.headers)
+        if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+            return response
+        telemetry.count("http_retries_total", host=urlsplit(url).hostname)
+        response.close()
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+# ==========================================
+# 🤝 4. SINGLE-FLIGHT
+# ==========================================
+# The same request is often made twice at once: the Search button racing
+# the autocomplete for the same title, a detail prefetch racing the click
+# on that row. A request identical to one already on the wire waits for it
+# and gets the same response object (treat it as read-only). Identity is
+# the method, the normalized URL and params, the JSON body and the
+# headers; streamed downloads are never shared. Only a leader of the same
+# or a higher priority is joined: a user request that finds background
+# work in flight sends its own, so it still goes ahead in the rate limiter
+# (see rate_limit.py), and later requests join it instead. The counts are
+# exported as http_flights_total{host,outcome}. HTTP_COALESCE=0 turns
+# this off.
+COALESCE = os.getenv('HTTP_COALESCE', "1") not in ("", "0")
+
+_flights = {}               # flight key -> (Future of the response, priority of its leader)
+_flights_lock = threading.Lock()
+_flight_counts = Counter()  # (host, "sent" | "coalesced") -> requests
+
+def _items(mapping):
+    return mapping.items() if hasattr(mapping, 'items') else mapping or ()
+
+def flight_key(method, url, params=None, json_body=None, data=None, headers=None):
+    """Hashable identity of a request; params equal to None are dropped, as requests does."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(name), str(value)) for name, value in _items(params) if value is not None]
+    body = json.dumps(json_body, sort_keys=True, separators=(",", ":")) if json_body is not None else None
+    if data is not None:
+        body = data if isinstance(data, (str, bytes)) else repr(sorted(_items(data)))
+    return (method.upper(), parts.scheme.lower(), parts.netloc.lower(), parts.path, tuple(sorted(query)), body,
+            tuple(sorted((str(name).lower(), str(value)) for name, value in _items(headers))))
+
+def coalescing_stats():
+    """{host: {"sent": requests sent, "coalesced": requests answered by one already in flight}}."""
+    with _flights_lock:
+        stats = {}
+        for (host, kind), count in _flight_counts.items():
+            stats.setdefault(host, {"sent": 0, "coalesced": 0})[kind] = count
+        return stats
+
+def _coalescing_metrics():
+    return [("http_flights_total", "counter", {"host": host, "outcome": kind}, count)
+            for host, counts in coalescing_stats().items() for kind, count in counts.items()]
+
+telemetry.register_collector(_coalescing_metrics)
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import rate_limit
+from pantry import get_pantry
+
+# ==========================================
+# 🎞️ MOVIE DETAIL LOADER
+# ==========================================
+# The detail view needs credits and videos. TMDB can return both inside
+# /movie/{id} through append_to_response, so one request replaces two or
+# three. The loader can also prefetch details for the rows the user is
+# most likely to open, so picking one of the top results is instant.
+DETAIL_APPENDS = ("credits", "videos")
+PREFETCH_TOP_N = 5
+
+class DetailLoader:
+    def __init__(self, base_url, headers, append=DETAIL_APPENDS, max_workers=2):
+        self.base_url = base_url
+        self.headers = headers
+        self.append = ",".join(append)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._in_flight = {}    # movie_id -> Future
+        self._lock = threading.Lock()
+
+    def get(self, movie_id):
+        """Full details for `movie_id`, joining a prefetch that is already running for it."""
+        with self._lock:
+            future = self._in_flight.get(movie_id)
+        if future is not None:
+            return future.result()
+        return self._load(movie_id)
+
+    def prefetch(self, movie_ids, limit=PREFETCH_TOP_N):
+        """Starts loading the first `limit` IDs in the background."""
+        with self._lock:
+            for movie_id in list(movie_ids)[:limit]:
+                if movie_id not in self._in_flight:
+                    self._in_flight[movie_id] = self._executor.submit(self._prefetch_one, movie_id)
+
+    def _prefetch_one(self, movie_id):
+        try:
+            with rate_limit.background():
+                return self._load(movie_id)
+        finally:
+            with self._lock:
+                self._in_flight.pop(movie_id, None)
+
+    def _load(self, movie_id):
+        def fetch():
+            response = http_client.get(f"{self.base_url}/movie/{movie_id}", headers=self.headers,
+                                       params={"append_to_response": self.append})
+            response.raise_for_status()
+            return response.json()
+
+        return get_pantry().get_or_fetch(f"tmdb:details:{movie_id}", fetch)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def trailer_key(details):
+    videos = details.get('videos', {}).get('results', [])
+    return next((v['key'] for v in videos if v['type'] == 'Trailer'), None)
+
+def top_cast(details, count=3):
+    return [p['name'] for p in details.get('credits', {}).get('cast', [])[:count]]
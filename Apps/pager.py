@@ -0,0 +1,74 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import rate_limit
+from pantry import get_pantry, SEARCH_TTL
+from records import Movie, decode_movies
+
+# ==========================================
+# 📄 STREAMING PAGINATION
+# ==========================================
+# TMDB lists come 20 to a page and AniList pages are whatever perPage asks
+# for. paginate() yields results lazily across pages, keeps the next few
+# pages loading in the background, and stops as soon as the consumer has
+# seen `want` results that pass its `keep` filter, so deep client-side
+# filters get full lists without walking every page.
+TMDB_PAGE_SIZE = 20
+PREFETCH_PAGES = 2
+MAX_PAGES = 5
+
+def paginate(fetch_page, keep=None, want=None, page_size=TMDB_PAGE_SIZE,
+             prefetch=PREFETCH_PAGES, max_pages=MAX_PAGES):
+    """Yields every result of pages 1..max_pages; `fetch_page(page)` returns that page's list.
+
+    Stops early once `want` yielded results passed `keep` (all results count when keep is None).
+    A page shorter than `page_size` is taken to be the last one.
+    """
+    passed = 0
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=max(prefetch, 1), thread_name_prefix="pager")
+    try:
+        for page in range(1, max_pages + 1):
+            future = futures.pop(page, None)
+            results = future.result() if future else fetch_page(page)
+
+            if len(results) >= page_size:
+                for ahead in range(page + 1, min(page + prefetch, max_pages) + 1):
+                    if ahead not in futures:
+                        # In a copy of the caller's context, so stale pages join its pantry.track() block
+                        futures[ahead] = executor.submit(contextvars.copy_context().run, _prefetch, fetch_page, ahead)
+
+            for item in results:
+                if keep is None or keep(item):
+                    passed += 1
+                yield item
+                if want is not None and passed >= want:
+                    return
+            if len(results) < page_size:
+                return
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def _prefetch(fetch_page, page):
+    # Pages nobody asked for yet are speculative
+    with rate_limit.background():
+        return fetch_page(page)
+
+def tmdb_page_fetcher(url, headers, params=None, cache_key=None, ttl=SEARCH_TTL):
+    """fetch_page for a TMDB list endpoint returning Movie records, each page cached in the pantry under `cache_key`."""
+    def fetch_page(page):
+        def fetch():
+            response = http_client.get(url, headers=headers, params=dict(params or {}, page=page))
+            response.raise_for_status()     # an error body must not be cached as an empty page
+            return [Movie.from_api(raw).to_row() for raw in response.json().get('results', [])]
+
+        if cache_key is None:
+            return decode_movies(fetch())
+        # Page 1 keeps the bare key so entries cached before paging existed still hit
+        key = cache_key if page == 1 else f"{cache_key}:p{page}"
+        return decode_movies(get_pantry().get_or_fetch(key, fetch, ttl=ttl))
+
+    return fetch_page
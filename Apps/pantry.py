@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import http_client
+import rate_limit
+import telemetry
+
+# ==========================================
+# ⚙️ 1. PANTRY CONFIG
+# ==========================================
+# The pantry used to be a single JSON file that was loaded and rewritten in
+# full on every lookup. It now lives in SQLite: one row per key, indexed,
+# bounded in size and safe to share between the CLI and both GUIs.
+PANTRY_DB = os.getenv('PANTRY_DB', "tmdb_pantry.db")
+LEGACY_PANTRY_FILE = "tmdb_pantry.json"
+
+MAX_ENTRIES = int(os.getenv('PANTRY_MAX_ENTRIES', 5000))
+DEFAULT_TTL = 7 * 24 * 3600     # recommendations barely move in a week
+SEARCH_TTL = 24 * 3600          # search / discover listings drift faster
+
+# Stale-while-revalidate: inside its kind's freshness window an entry is
+# served as is; past it (but before its TTL) it is still served at once
+# while a background refresh stores the current version. Kinds not listed
+# stay fresh until their TTL. Override with PANTRY_FRESHNESS, e.g.
+# "tmdb:search=600,tmdb:recs=3600" (seconds).
+FRESHNESS = {
+    "tmdb:search": 3600,
+    "tmdb:discover-list": 6 * 3600,
+    "tmdb:recs": 24 * 3600,
+    "anilist:search": 3600,
+    "anilist:seed": 6 * 3600,
+}
+REFRESH_WORKERS = 2
+
+def _parse_windows(text):
+    windows = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        kind, _, seconds = item.partition("=")
+        windows[kind.strip()] = float(seconds)
+    return windows
+
+FRESHNESS.update(_parse_windows(os.getenv('PANTRY_FRESHNESS', "")))
+
+def _kind(key):
+    # "tmdb:recs:550:p2" -> "tmdb:recs", a label that stays low-cardinality
+    return ":".join(key.split(":", 2)[:2])
+
+class Pantry:
+    def __init__(self, path=PANTRY_DB, max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        # One connection shared by the worker threads of this process; SQLite's
+        # own file locking (WAL + busy timeout) handles other processes.
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "stored_at" not in columns:
+            # Entries from before stale-while-revalidate have no age: they count as stale once
+            self._conn.execute("ALTER TABLE entries ADD COLUMN stored_at REAL")
+        self._refreshing = {}   # key -> future of its background refresh
+        self._refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="pantry-refresh")
+
+    # ==========================================
+    # 🔑 2. KEYED ACCESS
+    # ==========================================
+    def lookup(self, key):
+        """Returns (value, stale) for `key`; value is None if missing or expired.
+
+        Offline, expired entries are served too (and count as stale).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                telemetry.count("cache_requests_total", cache="pantry", kind=_kind(key), result="miss")
+                return None, False
+            value, expires_at, stored_at = row
+            expired = expires_at is not None and expires_at <= now
+            if expired and not http_client.OFFLINE:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                telemetry.count("cache_requests_total", cache="pantry", kind=_kind(key), result="expired")
+                return None, False
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        window = FRESHNESS.get(_kind(key))
+        stale = expired or (window is not None and (stored_at is None or now - stored_at > window))
+        telemetry.count("cache_requests_total", cache="pantry", kind=_kind(key), result="stale" if stale else "hit")
+        return json.loads(value), stale
+
+    def get(self, key):
+        """Returns the cached value for `key` (fresh or stale), or None if missing or expired."""
+        return self.lookup(key)[0]
+
+    def put(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_used, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now, now))
+            self._evict()
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """Serves `key` from the pantry, calling `fetch()` and storing its result on a miss.
+
+        A stale entry is returned as is and refreshed in the background.
+        """
+        value, stale = self.lookup(key)
+        if value is None:
+            value = fetch()
+            self.put(key, value, ttl=ttl)
+        elif stale:
+            self.revalidate(key, fetch, ttl=ttl)
+        return value
+
+    def revalidate(self, key, fetch, ttl=None):
+        """Stores a fresh `fetch()` for `key` on a background thread (at background priority).
+
+        Returns a future that resolves to True if the stored data changed, or
+        None when offline. A key already being refreshed reuses that refresh.
+        The future also joins the enclosing track() block, if any.
+        """
+        if http_client.OFFLINE:
+            return None
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._refreshing[key] = self._refresh_pool.submit(self._refresh, key, fetch, ttl)
+        revalidation = _tracking.get()
+        if revalidation is not None:
+            revalidation.add(future)
+        return future
+
+    def _refresh(self, key, fetch, ttl):
+        try:
+            with rate_limit.background():
+                value = fetch()
+            with self._lock:
+                row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            changed = row is None or row[0] != json.dumps(value)
+            self.put(key, value, ttl=ttl)
+            telemetry.count("cache_revalidations_total", kind=_kind(key), result="changed" if changed else "unchanged")
+            return changed
+        except Exception:
+            telemetry.count("cache_revalidations_total", kind=_kind(key), result="error")
+            raise
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def scan(self, prefix):
+        """Yields (key, value) for every live entry whose key starts with `prefix`, without touching LRU order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM entries WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+                (prefix, prefix + "\uffff", time.time())).fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ==========================================
+    # 🧹 3. EVICTION & MIGRATION
+    # ==========================================
+    def _evict(self):
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        overflow = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_used ASC LIMIT ?)", (overflow,))
+
+    def migrate_json(self, json_path=LEGACY_PANTRY_FILE, key_prefix="tmdb:recs:"):
+        """Imports the old whole-file JSON pantry once. Returns the number of entries copied."""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done or not os.path.exists(json_path):
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            legacy = {}
+
+        now = time.time()
+        rows = [(f"{key_prefix}{movie_id}", json.dumps(recs), now + self.default_ttl, now)
+                for movie_id, recs in legacy.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO entries (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_json', ?)", (json_path,))
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def close(self):
+        self._refresh_pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+# ==========================================
+# 🔄 4. SERVING STALE RESULTS
+# ==========================================
+# A search reads several entries (search hits, recommendation pages). A
+# track() block collects the refreshes it set off; serve_stale() turns
+# that into "show the cached answer now, hand over a fresher one later".
+_tracking = contextvars.ContextVar("pantry_tracking", default=None)
+
+class Revalidation:
+    """The background refreshes started inside one track() block."""
+    def __init__(self):
+        self.futures = []
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.futures)
+
+    def add(self, future):
+        with self._lock:
+            self.futures.append(future)
+
+    def changed(self, timeout=None):
+        """Waits for the refreshes; True if any of them stored different data."""
+        with self._lock:
+            futures = list(self.futures)
+        done, _ = wait(futures, timeout=timeout)
+        return any(future.exception() is None and future.result() for future in done)
+
+@contextmanager
+def track():
+    """Collects the refreshes started inside the block (threads only join if they run in a copy of its context)."""
+    revalidation = Revalidation()
+    token = _tracking.set(revalidation)
+    try:
+        yield revalidation
+    finally:
+        _tracking.reset(token)
+
+def serve_stale(fn, *args):
+    """Runs `fn(*args)` and returns (result, refresh).
+
+    refresh is None if everything `fn` read was fresh. Otherwise it is a
+    callable that waits for the background refreshes and returns
+    `fn(*args)` run again if any data changed, or None if nothing did.
+    """
+    with track() as revalidation:
+        result = fn(*args)
+    if not revalidation:
+        return result, None
+
+    def refresh():
+        return fn(*args) if revalidation.changed() else None
+    return result, refresh
+
+# ==========================================
+# 🍱 5. SHARED INSTANCE
+# ==========================================
+_default = None
+_default_lock = threading.Lock()
+
+def get_pantry():
+    """Returns the process-wide pantry, migrating the legacy JSON file on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                pantry = Pantry()
+                pantry.migrate_json()
+                _default = pantry
+    return _default
@@ -0,0 +1,111 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+import http_client
+import telemetry
+from pantry import get_pantry
+
+# ==========================================
+# ⚙️ 1. POSTER CACHE CONFIG
+# ==========================================
+# Two tiers:
+#   * memory: decoded PhotoImage objects in an LRU bounded by pixel bytes,
+#     so reselecting a row shows the poster without touching PIL at all.
+#   * disk: the raw image bytes stored under their SHA-256, with the
+#     url -> digest mapping kept in the pantry. Identical artwork shared by
+#     several URLs is stored once.
+POSTER_DIR = os.getenv('POSTER_CACHE_DIR', "poster_cache")
+MEMORY_BYTES = int(os.getenv('POSTER_MEMORY_MB', 48)) * 1024 * 1024
+INDEX_TTL = 90 * 24 * 3600
+
+# Used when /configuration can't be reached
+DEFAULT_POSTER_SIZES = ["w92", "w154", "w185", "w342", "w500", "w780", "original"]
+
+def pick_poster_size(poster_sizes, target_width):
+    """Smallest TMDB poster size at least `target_width` wide, else the largest one."""
+    widths = sorted((int(s[1:]), s) for s in poster_sizes if s.startswith("w") and s[1:].isdigit())
+    for width, label in widths:
+        if width >= target_width:
+            return label
+    return "original" if "original" in poster_sizes else widths[-1][1]
+
+class PosterCache:
+    def __init__(self, cache_dir=POSTER_DIR, max_bytes=MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._photos = OrderedDict()    # key -> (PhotoImage, size in bytes)
+        self._photo_bytes = 0
+
+    # ==========================================
+    # 🧠 2. MEMORY TIER (Tk thread only)
+    # ==========================================
+    def get_photo(self, key):
+        entry = self._photos.get(key)
+        telemetry.count("cache_requests_total", cache="poster_memory", result="miss" if entry is None else "hit")
+        if entry is None:
+            return None
+        self._photos.move_to_end(key)
+        return entry[0]
+
+    def put_photo(self, key, img_data):
+        """Builds the PhotoImage for a decoded image and keeps it in the LRU."""
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(img_data)
+        size = img_data.width * img_data.height * 4
+        old = self._photos.pop(key, None)
+        if old:
+            self._photo_bytes -= old[1]
+        self._photos[key] = (photo, size)
+        self._photo_bytes += size
+        while self._photo_bytes > self.max_bytes and len(self._photos) > 1:
+            _, (_, evicted) = self._photos.popitem(last=False)
+            self._photo_bytes -= evicted
+        return photo
+
+    # ==========================================
+    # 💾 3. DISK TIER (worker threads)
+    # ==========================================
+    def load_image(self, url, box=None):
+        """Returns the decoded image for `url`, shrunk to fit `box` (width, height) if given."""
+        # Pillow loads on the first poster (a worker thread), not when the window opens
+        from PIL import Image
+        content = self.load_bytes(url)
+        with telemetry.span("image_decode", bytes=len(content)):
+            img_data = Image.open(BytesIO(content))
+            img_data.load()
+            if box:
+                img_data.thumbnail(box)
+        return img_data
+
+    def load_bytes(self, url):
+        pantry = get_pantry()
+        digest = pantry.get(f"poster:{url}")
+        if digest:
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    content = f.read()
+                telemetry.count("cache_requests_total", cache="poster_disk", result="hit")
+                return content
+            except OSError:
+                pass
+        telemetry.count("cache_requests_total", cache="poster_disk", result="miss")
+
+        response = http_client.get(url)
+        response.raise_for_status()
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        pantry.put(f"poster:{url}", digest, ttl=INDEX_TTL)
+        return content
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest)
@@ -0,0 +1,75 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ==========================================
+# 🗺️ QUERY PLANNER
+# ==========================================
+# A search is a handful of lookups where some depend on others (the
+# recommendations need the base movie's ID, discover needs the actor and
+# keyword IDs). Each lookup is added as a named stage with its
+# dependencies; run() starts every stage as soon as its inputs are ready,
+# so the total time is the longest chain instead of the sum of all calls.
+class QueryPlan:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.stages = {}     # name -> (fn, deps)
+        self.timings = {}    # name -> (start offset, duration) in seconds
+        self.elapsed = 0.0
+
+    def add(self, name, fn, deps=()):
+        """Registers `fn(*dep_results)` as stage `name`."""
+        self.stages[name] = (fn, tuple(deps))
+        return self
+
+    def _needed(self, targets):
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name][1])
+        return needed
+
+    def run(self, *targets):
+        """Runs `targets` (default: every stage) plus whatever they depend on. Returns {name: result}."""
+        needed = self._needed(targets or self.stages)
+        results, running = {}, {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(results) < len(needed):
+                in_flight = set(running.values())
+                for name in needed:
+                    fn, deps = self.stages[name]
+                    if name in results or name in in_flight or not all(d in results for d in deps):
+                        continue
+                    # Each stage runs in a copy of the caller's context (e.g. its pantry.track() block)
+                    future = pool.submit(contextvars.copy_context().run,
+                                         self._timed, name, fn, [results[d] for d in deps], started)
+                    running[future] = name
+                if not running:
+                    raise ValueError(f"Query plan has a dependency cycle among: {sorted(needed - set(results))}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+        self.elapsed = time.perf_counter() - started
+        return results
+
+    def _timed(self, name, fn, args, started):
+        begin = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = (begin - started, end - begin)
+
+    def report(self):
+        lines = [f"{'STAGE':<18} {'START':>8} {'TIME':>8}"]
+        for name, (start, duration) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            lines.append(f"{name:<18} {start * 1000:>6.0f}ms {duration * 1000:>6.0f}ms")
+        serial = sum(duration for _, duration in self.timings.values())
+        lines.append(f"{'total':<18} {'':>8} {self.elapsed * 1000:>6.0f}ms  (serial would be ~{serial * 1000:.0f}ms)")
+        return "\n".join(lines)
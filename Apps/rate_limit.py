@@ -0,0 +1,195 @@
+import time
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import telemetry
+
+# ==========================================
+# ⚙️ 1. LIMITS & PRIORITIES
+# ==========================================
+# One token bucket per API host. The nominal limits below are only the
+# starting point: X-RateLimit-Limit / X-RateLimit-Remaining on every
+# response re-seed the bucket, and a 429 pauses the host for Retry-After
+# (or an exponential backoff) and halves the refill rate until requests
+# succeed again.
+USER = 0          # search, details: whatever the user is waiting on
+BACKGROUND = 1    # prefetch, autocomplete, bulk jobs
+
+HOST_LIMITS = {
+    # host: (requests, per seconds)
+    "graphql.anilist.co": (90, 60),
+    "api.themoviedb.org": (40, 1),
+}
+MAX_BACKOFF = 60.0
+
+_local = threading.local()
+
+def current_priority():
+    return getattr(_local, 'priority', USER)
+
+@contextmanager
+def background():
+    """Marks every request made by this thread inside the block as background work."""
+    previous = current_priority()
+    _local.priority = BACKGROUND
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+# ==========================================
+# 🪣 2. PER-HOST TOKEN BUCKET
+# ==========================================
+class HostLimiter:
+    def __init__(self, host, requests, per_seconds):
+        self.host = host
+        self.per_seconds = per_seconds
+        self.capacity = requests
+        self.nominal_rate = requests / per_seconds
+        self.rate = self.nominal_rate
+        self.tokens = float(requests)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = 1.0
+        self.waiting = [0, 0]           # waiters per priority
+        self._cond = threading.Condition()
+
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=USER):
+        """Blocks until a request may be sent. Background callers yield to waiting user requests."""
+        started = time.monotonic()
+        with self._cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    outranked = any(self.waiting[p] for p in range(priority))
+                    if now >= self.blocked_until and self.tokens >= 1 and not outranked:
+                        self.tokens -= 1
+                        break
+                    delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate, 0.005)
+                    self._cond.wait(timeout=delay)
+            finally:
+                self.waiting[priority] -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            self.requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def observe(self, status_code, headers):
+        """Re-seeds the bucket from the response headers and backs off on 429."""
+        now = time.monotonic()
+        with self._cond:
+            self._refill(now)
+            limit = _to_int(headers.get('X-RateLimit-Limit'))
+            if limit:
+                self.capacity = limit
+                self.nominal_rate = limit / self.per_seconds
+            remaining = _to_int(headers.get('X-RateLimit-Remaining'))
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+            if status_code == 429:
+                self.throttled += 1
+                retry_after = _retry_after_seconds(headers.get('Retry-After'))
+                pause = retry_after if retry_after is not None else self.backoff
+                self.blocked_until = max(self.blocked_until, now + min(pause, MAX_BACKOFF))
+                self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+                self.rate = max(self.rate / 2, self.nominal_rate / 16)
+                self.tokens = 0.0
+            else:
+                self.backoff = 1.0
+                self.rate = min(self.nominal_rate, self.rate + self.nominal_rate / 20)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": sum(self.waiting),
+                "waiting_user": self.waiting[USER],
+                "waiting_background": self.waiting[BACKGROUND],
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "avg_wait_ms": round(self.total_wait / self.requests * 1000, 1) if self.requests else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "rate_per_s": round(self.rate, 2),
+                "tokens": round(self.tokens, 1),
+            }
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after_seconds(value):
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# ==========================================
+# 🗂️ 3. SHARED REGISTRY
+# ==========================================
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def limiter_for(url):
+    """The shared limiter for the host of `url`, or None if the host isn't rate limited."""
+    host = urlsplit(url).hostname
+    if host not in HOST_LIMITS:
+        return None
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(host, *HOST_LIMITS[host])
+        return _limiters[host]
+
+def stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.host: limiter.stats() for limiter in limiters}
+
+# Limiter state in metrics_text() / metrics.prom, read at export time
+_METRICS = {
+    # stats() key: (metric name, type)
+    "requests": ("rate_limit_requests_total", "counter"),
+    "throttled": ("rate_limit_throttled_total", "counter"),
+    "waiting_user": ("rate_limit_waiting", "gauge"),
+    "waiting_background": ("rate_limit_waiting", "gauge"),
+    "avg_wait_ms": ("rate_limit_avg_wait_ms", "gauge"),
+    "max_wait_ms": ("rate_limit_max_wait_ms", "gauge"),
+    "rate_per_s": ("rate_limit_rate_per_second", "gauge"),
+    "tokens": ("rate_limit_tokens", "gauge"),
+}
+
+def _limiter_metrics():
+    metrics = []
+    for host, host_stats in stats().items():
+        for key, (name, kind) in _METRICS.items():
+            labels = {"host": host}
+            if key.startswith("waiting_"):
+                labels["priority"] = key[len("waiting_"):]
+            metrics.append((name, kind, labels, host_stats[key]))
+    return metrics
+
+telemetry.register_collector(_limiter_metrics)
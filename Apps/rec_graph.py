@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import rate_limit
+import telemetry
+from records import decode
+
+# ==========================================
+# ⚙️ 1. GRAPH CONFIG
+# ==========================================
+# Every "X is recommended for Y" edge the apps ever see (TMDB
+# /recommendations, AniList recommendations.nodes) is kept in a small
+# SQLite edge store, one graph per source. For queries the edges are
+# packed into a CSR adjacency (indptr / indices / weights NumPy arrays,
+# rebuilt from the store when new edges arrive) and ranked with
+# personalized PageRank from one or more seed IDs, with no network calls
+# at query time.
+GRAPH_DB = os.getenv('REC_GRAPH_DB', "rec_graph.db")
+RESTART = 0.15          # PageRank teleport probability back to the seeds
+ITERATIONS = 40
+TOLERANCE = 1e-8
+
+def edge_weight(rank):
+    # Earlier recommendations are stronger votes
+    return 1.0 / (1.0 + rank) ** 0.5
+
+# ==========================================
+# 🕸️ 2. CSR GRAPH & PERSONALIZED PAGERANK
+# ==========================================
+class CSRGraph:
+    def __init__(self, node_ids, indptr, indices, weights):
+        self.node_ids = node_ids              # row -> external ID
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.rows = {int(node_id): row for row, node_id in enumerate(node_ids)}
+        self._sources = np.repeat(np.arange(len(node_ids)), np.diff(indptr))
+        out_weight = np.bincount(self._sources, weights=weights, minlength=len(node_ids))
+        self._norm = weights / np.where(out_weight > 0, out_weight, 1)[self._sources]
+        self._dangling = out_weight == 0
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Builds the CSR from (src, dst, weight) triples."""
+        edges = list(edges)
+        node_ids = np.unique(np.array([e[0] for e in edges] + [e[1] for e in edges], dtype=np.int64))
+        if not edges:
+            return cls(node_ids, np.zeros(1, np.int64), np.zeros(0, np.int32), np.zeros(0, np.float64))
+        src = np.searchsorted(node_ids, np.array([e[0] for e in edges], dtype=np.int64))
+        dst = np.searchsorted(node_ids, np.array([e[1] for e in edges], dtype=np.int64))
+        weights = np.array([e[2] for e in edges], dtype=np.float64)
+        order = np.lexsort((dst, src))
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=indptr[1:])
+        return cls(node_ids, indptr, dst[order].astype(np.int32), weights[order])
+
+    def personalized_pagerank(self, seeds, restart=RESTART, iterations=ITERATIONS):
+        """Stationary visit probabilities of a walk that keeps restarting at `seeds`."""
+        seed_rows = [self.rows[s] for s in seeds if s in self.rows]
+        if not seed_rows:
+            return None
+        n = len(self.node_ids)
+        teleport = np.zeros(n)
+        teleport[seed_rows] = 1.0 / len(seed_rows)
+        rank = teleport.copy()
+        for _ in range(iterations):
+            spread = np.bincount(self.indices, weights=rank[self._sources] * self._norm, minlength=n)
+            # Walks stuck on a node without out-edges jump back to the seeds
+            spread += rank[self._dangling].sum() * teleport
+            updated = restart * teleport + (1 - restart) * spread
+            if np.abs(updated - rank).sum() < TOLERANCE:
+                rank = updated
+                break
+            rank = updated
+        return rank
+
+    def recommend(self, seeds, count=20, exclude=()):
+        """[(node ID, score)] ranked by personalized PageRank, seeds and `exclude` left out."""
+        rank = self.personalized_pagerank(seeds)
+        if rank is None:
+            return []
+        skip = {self.rows[s] for s in list(seeds) + list(exclude) if s in self.rows}
+        order = np.argsort(-rank, kind='stable')
+        return [(int(self.node_ids[row]), float(rank[row])) for row in order
+                if row not in skip and rank[row] > 0][:count]
+
+# ==========================================
+# 💾 3. EDGE STORE
+# ==========================================
+class RecGraph:
+    def __init__(self, path=GRAPH_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS edges (source TEXT, src INTEGER, dst INTEGER, weight REAL,"
+            " PRIMARY KEY (source, src, dst))")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS nodes (source TEXT, id INTEGER, data TEXT, crawled INTEGER DEFAULT 0,"
+            " PRIMARY KEY (source, id))")
+        self._csr = {}      # source -> CSRGraph built since the last new edge
+
+    def record(self, source, src_id, recommendations, src_item=None):
+        """Stores the edges src -> each recommended item (in rank order) and their metadata."""
+        # Node data is kept as a compact record row (see records.py)
+        recommendations = [decode(source, item) for item in recommendations]
+        rows = [(source, src_id, item.id, edge_weight(rank)) for rank, item in enumerate(recommendations)]
+        nodes = [(source, item.id, json.dumps(item.to_row())) for item in recommendations]
+        if src_item is not None:
+            nodes.append((source, src_id, json.dumps(decode(source, src_item).to_row())))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?)", rows)
+                self._conn.executemany(
+                    "INSERT INTO nodes (source, id, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(source, id) DO UPDATE SET data = excluded.data", nodes)
+                self._conn.execute(
+                    "INSERT INTO nodes (source, id, crawled) VALUES (?, ?, 1) "
+                    "ON CONFLICT(source, id) DO UPDATE SET crawled = 1", (source, src_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._csr.pop(source, None)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM edges")
+            self._conn.execute("DELETE FROM nodes")
+            self._csr.clear()
+
+    def is_crawled(self, source, node_id):
+        with self._lock:
+            row = self._conn.execute("SELECT crawled FROM nodes WHERE source = ? AND id = ?",
+                                     (source, node_id)).fetchone()
+        return bool(row and row[0])
+
+    def neighbours(self, source, node_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT dst FROM edges WHERE source = ? AND src = ? ORDER BY weight DESC",
+                                      (source, node_id)).fetchall()
+        return [row[0] for row in rows]
+
+    def item(self, source, node_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM nodes WHERE source = ? AND id = ?",
+                                     (source, node_id)).fetchone()
+        return decode(source, json.loads(row[0])) if row and row[0] else None
+
+    def csr(self, source):
+        """The CSR adjacency for `source`, rebuilt only after new edges arrive."""
+        with self._lock:
+            graph = self._csr.get(source)
+            if graph is None:
+                edges = self._conn.execute("SELECT src, dst, weight FROM edges WHERE source = ?", (source,)).fetchall()
+                graph = self._csr[source] = CSRGraph.from_edges(edges)
+        return graph
+
+    def recommend(self, source, seeds, count=20, exclude=()):
+        """Records (with graph_score set) for the top personalized-PageRank neighbours of `seeds`."""
+        results = []
+        for node_id, score in self.csr(source).recommend(seeds, count=count, exclude=exclude):
+            item = self.item(source, node_id)
+            if item:
+                item.graph_score = score
+                results.append(item)
+        return results
+
+# ==========================================
+# 🕷️ 4. CRAWLER
+# ==========================================
+def crawl(graph, source, seeds, fetch_recommendations, max_nodes=500, workers=4):
+    """Breadth-first expansion from `seeds`; fetch_recommendations(id) returns the rec item list.
+
+    fetch_recommendations must raise when the lookup fails and leave the
+    graph alone: crawl() records each node itself.
+
+    Runs at background priority and skips nodes crawled before. A node whose
+    fetch fails (network error, 429, offline) is left uncrawled for next
+    time; the crawl ends quietly when the interpreter shuts down under it.
+    Returns how many nodes were fetched.
+    """
+    def fetch(node):
+        with rate_limit.background():
+            try:
+                return node, fetch_recommendations(node)
+            except Exception as error:
+                telemetry.count("graph_crawl_errors_total", source=source, error=type(error).__name__)
+                return node, None
+
+    queue, queued, fetched = deque(seeds), set(seeds), 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl") as pool:
+        while queue and fetched < max_nodes:
+            batch = []
+            while queue and len(batch) < max_nodes - fetched and len(batch) < workers:
+                batch.append(queue.popleft())
+            todo = [node for node in batch if not graph.is_crawled(source, node)]
+            try:
+                futures = [pool.submit(fetch, node) for node in todo]
+            except RuntimeError:
+                break       # "cannot schedule new futures after shutdown": the app is exiting
+            for future in futures:
+                node, recs = future.result()
+                if recs is not None:
+                    graph.record(source, node, recs)
+                    fetched += 1
+            for node in batch:
+                for neighbour in graph.neighbours(source, node):
+                    if neighbour not in queued:
+                        queued.add(neighbour)
+                        queue.append(neighbour)
+    return fetched
+
+def start_background_crawl(graph, source, seeds, fetch_recommendations, max_nodes=200):
+    """Runs crawl() on a daemon thread so the apps can keep the graph growing while in use."""
+    thread = threading.Thread(target=crawl, args=(graph, source, seeds, fetch_recommendations, max_nodes),
+                              daemon=True, name=f"crawl-{source}")
+    thread.start()
+    return thread
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_graph():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RecGraph()
+        return _default
+
+if __name__ == "__main__":
+    # python rec_graph.py tmdb|anilist <seed id> [more ids...] : crawl recommendations outward from the seeds
+    if len(sys.argv) < 3 or sys.argv[1] not in ("tmdb", "anilist"):
+        print("Usage: python rec_graph.py tmdb|anilist <seed id> [more ids...]")
+        sys.exit(1)
+    source = sys.argv[1]
+    if source == "tmdb":
+        from app import crawl_recommendations as fetch_recs
+    else:
+        from anime_app import fetch_anime_recommendations as fetch_recs
+    count = crawl(get_graph(), source, [int(arg) for arg in sys.argv[2:]], fetch_recs,
+                  max_nodes=int(os.getenv('CRAWL_MAX_NODES', 500)))
+    print(f"🕸️ Crawled {count} titles")
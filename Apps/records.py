@@ -0,0 +1,161 @@
+# ==========================================
+# 🧱 COMPACT RESULT RECORDS
+# ==========================================
+# TMDB and AniList answer with large JSON objects, most of which the apps
+# never read. Results are decoded once into __slots__ records holding only
+# the fields the apps use (no per-object dict, lowercase title computed up
+# front for the sequel filters, genres as tuples). Caches store them as
+# plain JSON rows (lists in FIELDS order) instead of keyed objects.
+#
+# Records still answer m['title'] / m.get('release_date') like the dicts
+# they replace; get() falls back to the default when a field is None.
+# decode_*() accept a record, a cached row or a raw API dict (including
+# entries cached before records existed).
+
+class _Record:
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return getattr(self, key, None) is not None
+
+    def to_row(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r}, {self.display_title!r})"
+
+class Movie(_Record):
+    FIELDS = ("id", "title", "original_title", "release_date", "genre_ids", "vote_average",
+              "popularity", "poster_path", "overview")
+    __slots__ = FIELDS + ("title_lower", "graph_score")
+
+    def __init__(self, id, title, original_title=None, release_date=None, genre_ids=(), vote_average=None,
+                 popularity=None, poster_path=None, overview=None, graph_score=None):
+        self.id = id
+        self.title = title or ""
+        self.original_title = original_title
+        self.release_date = release_date
+        self.genre_ids = tuple(genre_ids or ())
+        self.vote_average = vote_average
+        self.popularity = popularity
+        self.poster_path = poster_path
+        self.overview = overview
+        self.title_lower = self.title.lower()
+        self.graph_score = graph_score
+
+    @property
+    def display_title(self):
+        return self.title
+
+    @classmethod
+    def from_api(cls, raw):
+        get = raw.get
+        return cls(raw['id'], get('title'), get('original_title'), get('release_date'), get('genre_ids'),
+                   get('vote_average'), get('popularity'), get('poster_path'), get('overview'),
+                   get('graph_score'))
+
+class AnimeTitle:
+    __slots__ = ("english", "romaji")
+
+    def __init__(self, english=None, romaji=None):
+        self.english = english
+        self.romaji = romaji
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+class Anime(_Record):
+    FIELDS = ("id", "english", "romaji", "genres", "averageScore", "seasonYear", "popularity",
+              "description", "cover")
+    __slots__ = ("id", "title", "genres", "averageScore", "seasonYear", "popularity", "description", "cover",
+                 "title_lower", "graph_score")
+
+    def __init__(self, id, english=None, romaji=None, genres=(), averageScore=None, seasonYear=None,
+                 popularity=None, description=None, cover=None, graph_score=None):
+        self.id = id
+        self.title = AnimeTitle(english, romaji)
+        self.genres = tuple(genres or ())
+        self.averageScore = averageScore
+        self.seasonYear = seasonYear
+        self.popularity = popularity
+        self.description = description
+        self.cover = cover
+        self.title_lower = (english or romaji or "").lower()
+        self.graph_score = graph_score
+
+    @property
+    def english(self):
+        return self.title.english
+
+    @property
+    def romaji(self):
+        return self.title.romaji
+
+    @property
+    def display_title(self):
+        return self.title.english or self.title.romaji
+
+    @property
+    def coverImage(self):
+        return {"large": self.cover} if self.cover else None
+
+    @classmethod
+    def from_api(cls, raw):
+        get = raw.get
+        title = get('title') or {}
+        return cls(raw['id'], title.get('english'), title.get('romaji'), get('genres'), get('averageScore'),
+                   get('seasonYear') or (get('startDate') or {}).get('year'), get('popularity'),
+                   get('description'), (get('coverImage') or {}).get('large'), get('graph_score'))
+
+    def update(self, detail):
+        """Fills in what a lazily fetched AniList detail (genres, description, cover) adds."""
+        if detail.get('genres'):
+            self.genres = tuple(detail['genres'])
+        if detail.get('description') is not None:
+            self.description = detail['description']
+        if detail.get('coverImage'):
+            self.cover = detail['coverImage'].get('large')
+
+# ==========================================
+# 🔄 DECODING / ENCODING
+# ==========================================
+def _decoder(cls):
+    def decode(value):
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, list):
+            return cls(*value)
+        return cls.from_api(value)
+    return decode
+
+decode_movie = _decoder(Movie)
+decode_anime = _decoder(Anime)
+DECODERS = {"tmdb": decode_movie, "anilist": decode_anime}
+
+def decode_movies(values):
+    return [decode_movie(value) for value in values or ()]
+
+def decode_anime_list(values):
+    return [decode_anime(value) for value in values or ()]
+
+def decode(source, value):
+    return DECODERS[source](value)
+
+def to_rows(records):
+    """Records -> JSON-ready rows for the pantry / graph store."""
+    return [record.to_row() for record in records]
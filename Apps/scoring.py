@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+
+# ==========================================
+# ⚙️ 1. FEATURES & WEIGHTS
+# ==========================================
+# Ranks recommendation candidates against a seed title in one batched
+# NumPy pass. Every candidate becomes a row of features:
+#   genre        cosine similarity of multi-hot genre vectors
+#   filter_genre 1 if the candidate has the genre the user asked for
+#   year         exp(-|year gap| / YEAR_SCALE) to the requested year (or the seed's)
+#   rating       vote average scaled to 0-1
+#   popularity   log popularity scaled to the most popular candidate
+# Features that don't apply to a query (no genre asked for, no years known)
+# are dropped and the remaining weights renormalised.
+WEIGHTS = {"genre": 0.40, "filter_genre": 0.20, "year": 0.15, "rating": 0.15, "popularity": 0.10}
+YEAR_SCALE = 10.0
+FEATURE_LABELS = {"genre": "genre overlap", "filter_genre": "your genre", "year": "era",
+                  "rating": "rating", "popularity": "popularity"}
+
+TMDB_GENRE_NAMES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+    18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+    9648: "Mystery", 10749: "Romance", 878: "Sci-Fi", 10770: "TV Movie", 53: "Thriller",
+    10752: "War", 37: "Western",
+}
+
+def _year(date):
+    return int(date[:4]) if date and date[:4].isdigit() else None
+
+# Per-source accessors on Movie / Anime records (records.py): genres, year, rating (0-1) and raw popularity
+TMDB_FEATURES = {
+    "genres": lambda m: m.genre_ids,
+    "year": lambda m: _year(m.release_date),
+    "rating": lambda m: (m.vote_average or 0) / 10,
+    "popularity": lambda m: m.popularity or 0,
+    "genre_name": lambda g: TMDB_GENRE_NAMES.get(g, str(g)),
+}
+ANILIST_FEATURES = {
+    "genres": lambda a: a.genres,
+    "year": lambda a: a.seasonYear,
+    "rating": lambda a: (a.averageScore or 0) / 100,
+    "popularity": lambda a: a.popularity or 0,
+    "genre_name": lambda g: g,
+}
+
+# ==========================================
+# 🧮 2. SCORER
+# ==========================================
+class SimilarityScorer:
+    def __init__(self, features, weights=WEIGHTS, year_scale=YEAR_SCALE):
+        self.features = features
+        self.weights = weights
+        self.year_scale = year_scale
+
+    def encode(self, items, vocab):
+        """Feature arrays for `items`: multi-hot genres [n, len(vocab)], years (NaN if unknown), ratings, popularity."""
+        f = self.features
+        genres = np.zeros((len(items), len(vocab)), dtype=np.float32)
+        for row, item in enumerate(items):
+            columns = [vocab[g] for g in f["genres"](item) if g in vocab]
+            genres[row, columns] = 1.0
+        years = np.array([f["year"](item) or np.nan for item in items], dtype=np.float64)
+        ratings = np.array([f["rating"](item) for item in items], dtype=np.float64)
+        popularity = np.array([f["popularity"](item) for item in items], dtype=np.float64)
+        return genres, years, ratings, popularity
+
+    def rank(self, seed, candidates, target_year=None, target_genre=None):
+        """Candidates sorted by weighted similarity to `seed`, each with a per-feature explanation."""
+        if not candidates:
+            return []
+        f = self.features
+        all_genres = set(f["genres"](seed)) | {g for c in candidates for g in f["genres"](c)}
+        if target_genre is not None:
+            all_genres.add(target_genre)
+        vocab = {g: i for i, g in enumerate(sorted(all_genres, key=str))}
+
+        genres, years, ratings, popularity = self.encode(candidates, vocab)
+        seed_genres, seed_years, _, _ = self.encode([seed], vocab)
+        seed_vec = seed_genres[0]
+
+        columns = {}
+        norms = np.linalg.norm(genres, axis=1) * np.linalg.norm(seed_vec)
+        columns["genre"] = np.divide(genres @ seed_vec, norms, out=np.zeros(len(candidates)), where=norms > 0)
+        if target_genre is not None:
+            columns["filter_genre"] = genres[:, vocab[target_genre]].astype(np.float64)
+        ref_year = float(target_year) if target_year else seed_years[0]
+        if not math.isnan(ref_year) and not np.isnan(years).all():
+            columns["year"] = np.nan_to_num(np.exp(-np.abs(years - ref_year) / self.year_scale))
+        columns["rating"] = ratings
+        top_popularity = popularity.max()
+        if top_popularity > 0:
+            columns["popularity"] = np.log1p(popularity) / np.log1p(top_popularity)
+
+        names = list(columns)
+        weights = np.array([self.weights[name] for name in names])
+        weights /= weights.sum()
+        contributions = np.stack([columns[name] for name in names], axis=1) * weights
+        scores = contributions.sum(axis=1)
+
+        seed_genre_set = set(f["genres"](seed))
+        ranked = []
+        for row in np.argsort(-scores, kind='stable'):
+            item = candidates[row]
+            ranked.append({
+                "item": item,
+                "score": float(scores[row]),
+                "features": {name: round(float(contributions[row, i]), 4) for i, name in enumerate(names)},
+                "shared_genres": [f["genre_name"](g) for g in f["genres"](item) if g in seed_genre_set],
+                "year": None if np.isnan(years[row]) else int(years[row]),
+                "year_gap": None if "year" not in columns or np.isnan(years[row]) else int(abs(years[row] - ref_year)),
+            })
+        return ranked
+
+def explain(ranked):
+    """One-line reason for a ranked entry, strongest features first."""
+    parts = []
+    if ranked["shared_genres"]:
+        parts.append(f"Shared genres: {', '.join(ranked['shared_genres'])}")
+    if ranked["year_gap"] is not None:
+        parts.append("same year" if ranked["year_gap"] == 0 else f"{ranked['year_gap']} yrs apart")
+    top = max(ranked["features"], key=ranked["features"].get)
+    parts.append(f"match {ranked['score'] * 100:.0f}% (strongest: {FEATURE_LABELS[top]})")
+    return " · ".join(parts)
@@ -0,0 +1,51 @@
+import sys
+import json
+import time
+import importlib
+
+import telemetry
+
+STARTED = time.perf_counter()
+
+# ==========================================
+# 🚀 GUI LAUNCHER
+# ==========================================
+# The GUIs open their window first and load the heavy libraries
+# (requests, Pillow, NumPy) afterwards on a worker, before the first
+# search needs them. Flags understood by both GUIs:
+#   --dev            run under the hupper reloader (restarts on file edits;
+#                    a second, file-watching process, so development only)
+#   --startup-time   print how long the window took to appear, then quit
+# The time is measured from the first import of this module (the first
+# line of each GUI), so interpreter start-up itself is not included.
+HEAVY_MODULES = ("requests", "PIL.Image", "PIL.ImageTk", "numpy")
+
+def launch(module_name, main, argv=None):
+    if "--dev" in (sys.argv if argv is None else argv):
+        import hupper
+        hupper.start_reloader(f"{module_name}.main")
+    main()
+
+def _preload(modules):
+    for name in modules:
+        importlib.import_module(name)
+
+def window_ready(root, fetcher, extra_modules=(), deferred=()):
+    """Call once the window is built: records time-to-window, then warms heavy imports off the Tk thread.
+
+    `deferred` callables (startup work that touches the network) run once
+    the window has been drawn.
+    """
+    def on_first_idle():
+        root.update_idletasks()
+        elapsed = time.perf_counter() - STARTED
+        telemetry.observe("startup_seconds", elapsed)
+        if "--startup-time" in sys.argv:
+            print(json.dumps({"app": root.title(), "startup_ms": round(elapsed * 1000, 1)}))
+            root.destroy()
+            return
+        fetcher.submit("preload", _preload, HEAVY_MODULES + tuple(extra_modules))
+        for start in deferred:
+            start()
+
+    root.after_idle(on_first_idle)
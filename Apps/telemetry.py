@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from functools import wraps
+from urllib.parse import urlsplit
+from collections import defaultdict
+
+# ==========================================
+# ⚙️ 1. TELEMETRY CONFIG
+# ==========================================
+# Spans (network requests, image decodes, UI callbacks), counters (cache
+# hits / misses) and histograms (durations, Tk main-loop stalls) for every
+# app in the suite. Off by default; turn it on with
+#   DISCOVERY_TRACE=trace.jsonl      one JSON object per finished span
+#   DISCOVERY_METRICS=metrics.prom   Prometheus text snapshot, written on exit
+# or by passing --trace to any app (both files in the working directory).
+# When off, span() hands back one shared no-op object and the counters
+# return after a single flag check.
+TRACE_PATH = os.getenv('DISCOVERY_TRACE')
+METRICS_PATH = os.getenv('DISCOVERY_METRICS')
+DEFAULT_TRACE_FILE = "trace.jsonl"
+DEFAULT_METRICS_FILE = "metrics.prom"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STALL_THRESHOLD = 0.1       # main-loop delays above this are traced as spans too
+
+enabled = bool(TRACE_PATH or METRICS_PATH)
+
+_lock = threading.Lock()
+_local = threading.local()
+_trace_file = None
+_counters = defaultdict(float)          # (name, labels) -> value
+_histograms = {}                         # (name, labels) -> [bucket counts..., count, sum]
+_collectors = []                         # callables read at export time, see register_collector()
+_span_ids = iter(range(1, sys.maxsize))
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def endpoint(url):
+    """URL -> low-cardinality label: host and path, IDs and file names templated, query dropped."""
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    # segments[1] is kept as is: it's TMDB's API version ("/3/...")
+    templated = [("{id}" if segment.isdigit() else "{file}" if "." in segment else segment) if i > 1 else segment
+                 for i, segment in enumerate(segments)]
+    return parts.netloc + "/".join(templated)
+
+# ==========================================
+# 📈 2. COUNTERS & HISTOGRAMS
+# ==========================================
+def count(name, value=1, **labels):
+    if not enabled:
+        return
+    with _lock:
+        _counters[(name, _labels(labels))] += value
+
+def observe(name, seconds, **labels):
+    if not enabled:
+        return
+    with _lock:
+        entry = _histograms.setdefault((name, _labels(labels)), [0] * (len(BUCKETS) + 2))
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry[i] += 1
+        entry[-2] += 1
+        entry[-1] += seconds
+
+def register_collector(collect):
+    """Adds values kept by another module to metrics_text().
+
+    collect() is called on every export and returns (name, type, labels dict,
+    value) tuples; type is "counter" or "gauge". It runs whether or not
+    telemetry is enabled, so the module keeps its own numbers.
+    """
+    with _lock:
+        _collectors.append(collect)
+
+# ==========================================
+# 🧵 3. SPANS
+# ==========================================
+class Span:
+    __slots__ = ("name", "attrs", "start", "span_id", "parent_id")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent_id = stack[-1].span_id if stack else None
+        self.span_id = next(_span_ids)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        observe(f"{self.name}_seconds", duration, **{k: v for k, v in self.attrs.items() if k in ("endpoint", "status")})
+        _write({"ts": round(time.time() - duration, 6), "span": self.name, "id": self.span_id,
+                "parent": self.parent_id, "thread": threading.current_thread().name,
+                "duration_ms": round(duration * 1000, 3), **self.attrs})
+        return False
+
+class _NoSpan:
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name, **attrs):
+    """Times the with-block as span `name`; attributes can be added later with .set()."""
+    return Span(name, attrs) if enabled else _NO_SPAN
+
+def traced(name):
+    """Decorator form of span() for callbacks such as on_select_movie."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _write(record):
+    if _trace_file is None:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        _trace_file.write(line)
+
+# ==========================================
+# 🖥️ 4. TK MAIN-LOOP STALLS
+# ==========================================
+def watch_tk(root, interval_ms=50):
+    """Schedules a heartbeat on the Tk loop; any lateness is time the loop was blocked."""
+    if not enabled:
+        return
+    interval = interval_ms / 1000
+    state = {"due": time.perf_counter() + interval}
+
+    def beat():
+        now = time.perf_counter()
+        stall = now - state["due"]
+        if stall > 0:
+            observe("tk_stall_seconds", stall)
+            if stall > STALL_THRESHOLD:
+                count("tk_stalls_total")
+                _write({"ts": round(time.time() - stall, 6), "span": "tk_stall", "thread": "MainThread",
+                        "duration_ms": round(stall * 1000, 3)})
+        state["due"] = now + interval
+        root.after(interval_ms, beat)
+
+    root.after(interval_ms, beat)
+
+# ==========================================
+# 📤 5. EXPORT
+# ==========================================
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def metrics_text():
+    """Prometheus text exposition of every counter, collected value and histogram so far."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(entry)) for key, entry in _histograms.items())
+        collectors = list(_collectors)
+    collected = sorted((name, kind, _labels(labels), value)
+                       for collect in collectors for name, kind, labels, value in collect())
+    lines, typed = [], set()
+    for name, kind, labels, value in [(name, "counter", labels, value) for (name, labels), value in counters] + collected:
+        if name not in typed:
+            lines.append(f"# TYPE {name} {kind}")
+            typed.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), entry in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        for bound, bucket in zip(BUCKETS, entry):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {bucket}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {entry[-2]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {entry[-2]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {entry[-1]:.6f}")
+    return "\n".join(lines) + "\n"
+
+def flush():
+    if _trace_file is not None:
+        with _lock:
+            _trace_file.flush()
+    if METRICS_PATH:
+        with open(METRICS_PATH, "w", encoding="utf-8") as f:
+            f.write(metrics_text())
+
+def enable(trace_path=DEFAULT_TRACE_FILE, metrics_path=DEFAULT_METRICS_FILE):
+    global enabled, TRACE_PATH, METRICS_PATH, _trace_file
+    with _lock:
+        TRACE_PATH, METRICS_PATH = trace_path, metrics_path
+        if trace_path and _trace_file is None:
+            _trace_file = open(trace_path, "a", encoding="utf-8", buffering=1 << 16)
+        enabled = True
+
+def configure(argv=None):
+    """Turns telemetry on if --trace is among `argv` (default sys.argv)."""
+    if "--trace" in (sys.argv if argv is None else argv):
+        enable(TRACE_PATH or DEFAULT_TRACE_FILE, METRICS_PATH or DEFAULT_METRICS_FILE)
+
+if enabled:
+    enable(TRACE_PATH, METRICS_PATH)
+atexit.register(flush)
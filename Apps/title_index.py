@@ -0,0 +1,201 @@
+import os
+import re
+import bisect
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+
+from pantry import get_pantry
+from watchlist import get_watchlist
+from records import decode_movies, decode_anime_list
+
+# ==========================================
+# ⚙️ 1. TITLE INDEX CONFIG
+# ==========================================
+# Every title the apps see (search hits, recommendations, cached lists,
+# watchlists) is remembered in a small SQLite table per source and held in
+# memory as:
+#   * a sorted list of word-start keys ("the dark knight", "dark knight",
+#     "knight") for prefix lookups by bisection
+#   * a trigram -> entries inverted index for typo-tolerant matches
+# English and romaji names are both indexed; the display title is returned.
+# Suggestions are answered locally; the network is only needed when the
+# index has too few matches for a query.
+TITLE_DB = os.getenv('TITLE_INDEX_DB', "title_index.db")
+WATCHLIST_FILES = {"tmdb": "watchlist.txt", "anilist": "anime_watchlist.txt"}
+MAX_PREFIX_SCAN = 256       # keys inspected per prefix lookup
+MIN_TRIGRAM_MATCH = 0.6     # share of the query's trigrams a fuzzy match must contain
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    def __init__(self, source, path=TITLE_DB):
+        self.source = source
+        self._lock = threading.Lock()
+        self._titles = []           # entry -> display title
+        self._names = []            # entry -> normalized display title
+        self._popularity = []       # entry -> popularity, for ordering ties
+        self._entries = {}          # normalized display title -> entry
+        self._prefix_keys = []      # sorted (word-start key, entry)
+        self._grams = {}            # trigram -> [entry]
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS titles (source TEXT, title TEXT, alt TEXT, popularity REAL,"
+            " PRIMARY KEY (source, title))")
+        rows = self._conn.execute("SELECT title, alt, popularity FROM titles WHERE source = ?", (source,)).fetchall()
+        for title, alt, popularity in rows:
+            self._insert(title, alt.split("\n") if alt else [], popularity)
+        self._prefix_keys.sort()
+
+    def __len__(self):
+        return len(self._titles)
+
+    def clear(self):
+        with self._lock:
+            self._titles, self._names, self._popularity = [], [], []
+            self._entries, self._prefix_keys, self._grams = {}, [], {}
+            self._conn.execute("DELETE FROM titles WHERE source = ?", (self.source,))
+
+    # ==========================================
+    # ➕ 2. ADDING TITLES
+    # ==========================================
+    def _insert(self, title, alts, popularity):
+        """In-memory insert; returns True if the title is new or its popularity changed.
+
+        New prefix keys are appended unsorted; callers sort once per batch.
+        """
+        key = normalize(title)
+        if not key:
+            return False
+        entry = self._entries.get(key)
+        if entry is not None:
+            if popularity > self._popularity[entry]:
+                self._popularity[entry] = popularity
+                return True
+            return False
+
+        entry = self._entries[key] = len(self._titles)
+        self._titles.append(title)
+        self._names.append(key)
+        self._popularity.append(popularity)
+        names = {key} | {normalize(alt) for alt in alts if alt}
+        grams = set()
+        for name in filter(None, names):
+            words = name.split(" ")
+            for start in range(len(words)):
+                self._prefix_keys.append((" ".join(words[start:]), entry))
+            grams |= trigrams(name)
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(entry)
+        return True
+
+    def add_many(self, items):
+        """Adds (title, alt titles, popularity) triples, persisting the new ones in one transaction."""
+        changed = []
+        with self._lock:
+            for title, alts, popularity in items:
+                alts = [alt for alt in alts if alt and alt != title]
+                if title and self._insert(title, alts, popularity or 0):
+                    changed.append((self.source, title, "\n".join(alts), popularity or 0))
+            if changed:
+                self._prefix_keys.sort()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT INTO titles VALUES (?, ?, ?, ?) ON CONFLICT(source, title) DO UPDATE SET "
+                        "popularity = max(popularity, excluded.popularity)", changed)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        return len(changed)
+
+    # ==========================================
+    # 🔎 3. SUGGESTIONS
+    # ==========================================
+    def suggest(self, query, limit=5):
+        """Up to `limit` display titles for `query`: title prefixes, then word prefixes, then fuzzy matches."""
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            # A match at the start of the title beats one at a later word; popularity breaks ties
+            scored = {}
+            at = bisect.bisect_left(self._prefix_keys, (query,))
+            for key, entry in self._prefix_keys[at:at + MAX_PREFIX_SCAN]:
+                if not key.startswith(query):
+                    break
+                rank = (0 if key == self._names[entry] else 1, -self._popularity[entry])
+                if rank < scored.get(entry, (2,)):
+                    scored[entry] = rank
+            ranked = sorted(scored, key=scored.get)
+
+            if len(ranked) < limit:
+                query_grams = trigrams(query)
+                counts = Counter()
+                for gram in query_grams:
+                    counts.update(self._grams.get(gram, ()))
+                needed = MIN_TRIGRAM_MATCH * len(query_grams)
+                fuzzy = [entry for entry, shared in counts.items() if shared >= needed and entry not in scored]
+                fuzzy.sort(key=lambda entry: (-counts[entry], -self._popularity[entry]))
+                ranked += fuzzy
+            return [self._titles[entry] for entry in ranked[:limit]]
+
+# ==========================================
+# 🔌 4. APP INTEGRATION
+# ==========================================
+def tmdb_titles(movies):
+    return [(m.get('title'), [m.get('original_title')], m.get('popularity')) for m in movies]
+
+def anilist_titles(media):
+    return [((a['title'].get('english') or a['title'].get('romaji')), [a['title'].get('romaji')], a.get('popularity'))
+            for a in media]
+
+def _bootstrap(index):
+    """First start: index what the pantry and the watchlists already hold."""
+    pantry = get_pantry()
+    if index.source == "tmdb":
+        for _, value in pantry.scan("tmdb:search:"):
+            index.add_many(tmdb_titles(decode_movies(value.get('results'))))
+        for prefix in ("tmdb:recs:", "tmdb:discover-list:"):
+            for _, value in pantry.scan(prefix):
+                index.add_many(tmdb_titles(decode_movies(value)))
+    else:
+        for _, media in pantry.scan("anilist:search:"):
+            # Lists cached before the search was trimmed carry every row's recommendations
+            recs = [node['mediaRecommendation'] for a in media if isinstance(a, dict)
+                    for node in (a.get('recommendations') or {}).get('nodes', []) if node['mediaRecommendation']]
+            index.add_many(anilist_titles(decode_anime_list(media + recs)))
+        for _, seed in pantry.scan("anilist:seed:"):
+            if isinstance(seed, list) and seed:
+                index.add_many(anilist_titles(decode_anime_list([seed[0]] + seed[1])))
+
+    path = WATCHLIST_FILES[index.source]
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            # Lines look like "Title (Year)" or just "Title"
+            names = [re.sub(r"\s*\(\d{4}\)\s*$", "", line.strip()) for line in f]
+        index.add_many((name, [], 0) for name in names if name)
+    index.add_many((entry['title'], [], 0) for entry in get_watchlist().entries(index.source))
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_title_index(source):
+    """The process-wide index for "tmdb" or "anilist", seeded from the pantry the first time."""
+    with _indexes_lock:
+        index = _indexes.get(source)
+        if index is None:
+            index = _indexes[source] = TitleIndex(source)
+            if not len(index):
+                _bootstrap(index)
+        return index
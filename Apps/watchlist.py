@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import rate_limit
+
+# ==========================================
+# ⚙️ 1. WATCHLIST CONFIG
+# ==========================================
+# Saved titles live in one SQLite table keyed by (source, id) instead of
+# free-text lines, and every entry is also held in a dict so "is this
+# already saved?" is a single lookup while the result lists are drawn.
+# The old watchlist.txt / anime_watchlist.txt files are imported once
+# (each line is looked up by title, and by year where one is given);
+# lines added to them later are picked up on the next import.
+WATCHLIST_DB = os.getenv('WATCHLIST_DB', "watchlist.db")
+TEXT_FILES = {"tmdb": "watchlist.txt", "anilist": "anime_watchlist.txt"}
+REFRESH_WORKERS = 4     # the per-host rate limiter still paces the actual requests
+SAVED_MARK = "★"
+
+def tmdb_entry(movie):
+    return {"id": movie['id'], "title": movie['title'], "year": (movie.get('release_date') or "")[:4],
+            "rating": movie.get('vote_average'), "poster": movie.get('poster_path')}
+
+def anilist_entry(anime):
+    return {"id": anime['id'], "title": anime['title'].get('english') or anime['title'].get('romaji'),
+            "year": str(anime.get('seasonYear') or ""), "rating": anime.get('averageScore'),
+            "poster": (anime.get('coverImage') or {}).get('large')}
+
+ENTRY_BUILDERS = {"tmdb": tmdb_entry, "anilist": anilist_entry}
+FIELDS = ("id", "title", "year", "rating", "poster", "added", "refreshed")
+
+def parse_line(line):
+    """'Title (Year)' or 'Title' -> (title, year or None)."""
+    match = re.match(r"^(.*?)\s*\((\d{4}|\?{4})\)\s*$", line.strip())
+    if match:
+        return match.group(1), match.group(2) if match.group(2).isdigit() else None
+    return line.strip(), None
+
+# ==========================================
+# 💾 2. THE STORE
+# ==========================================
+class Watchlist:
+    def __init__(self, path=WATCHLIST_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (source TEXT, id INTEGER, title TEXT, year TEXT, rating REAL,"
+            " poster TEXT, added REAL, refreshed REAL, PRIMARY KEY (source, id))")
+        # Byte offset up to which each text file has been imported
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY, offset INTEGER)")
+        self._entries = {}      # (source, id) -> entry dict
+        for source, *row in self._conn.execute(f"SELECT source, {', '.join(FIELDS)} FROM entries ORDER BY added"):
+            entry = dict(zip(FIELDS, row))
+            self._entries[(source, entry['id'])] = entry
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def contains(self, source, item_id):
+        return (source, item_id) in self._entries
+
+    def entries(self, source):
+        """Saved entries for `source`, oldest first."""
+        with self._lock:
+            return [dict(entry) for (s, _), entry in self._entries.items() if s == source]
+
+    def add(self, source, item):
+        """Saves an API item (TMDB movie / AniList media); returns False if it was already saved."""
+        entry = ENTRY_BUILDERS[source](item)
+        return self._add_entries(source, [entry]) == 1
+
+    def remove(self, source, item_id):
+        with self._lock:
+            if self._entries.pop((source, item_id), None) is not None:
+                self._conn.execute("DELETE FROM entries WHERE source = ? AND id = ?", (source, item_id))
+
+    def _add_entries(self, source, entries):
+        now = time.time()
+        with self._lock:
+            new = []
+            for entry in entries:
+                if (source, entry['id']) not in self._entries:
+                    entry = {**entry, "added": now, "refreshed": now}
+                    self._entries[(source, entry['id'])] = entry
+                    new.append(entry)
+            if new:
+                self._write(source, new)
+        return len(new)
+
+    def update(self, source, items):
+        """Replaces the metadata of already saved entries with fresh API items."""
+        now = time.time()
+        with self._lock:
+            changed = []
+            for item in items:
+                old = self._entries.get((source, item['id']))
+                if old is not None:
+                    entry = {**ENTRY_BUILDERS[source](item), "added": old['added'], "refreshed": now}
+                    self._entries[(source, item['id'])] = entry
+                    changed.append(entry)
+            if changed:
+                self._write(source, changed)
+        return len(changed)
+
+    def _write(self, source, entries):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO entries VALUES (?, {', '.join('?' * len(FIELDS))})",
+                [(source, *(entry[field] for field in FIELDS)) for entry in entries])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # ==========================================
+    # 📥 3. IMPORTING THE TEXT FILES
+    # ==========================================
+    def import_text(self, source, resolve, path=None, workers=REFRESH_WORKERS):
+        """Adds the lines of the old text watchlist not imported yet.
+
+        resolve(title, year) returns the matching API item or None, and
+        raises if the lookup itself failed (network error, 429, offline).
+        Returns (added, lines with no match, lines whose lookup failed). The
+        import is only recorded up to the first failed line, so those lines
+        are looked up again by the next import.
+        """
+        path = path or TEXT_FILES[source]
+        if not os.path.exists(path):
+            return 0, [], []
+        key = os.path.abspath(path)
+        row = self._conn.execute("SELECT offset FROM imports WHERE path = ?", (key,)).fetchone()
+        # A file that shrank since the last import was rewritten: read it again from the top
+        start = row[0] if row and row[0] <= os.path.getsize(path) else 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        lines, offset = [], start     # (byte offset of the line, text)
+        for raw in data.splitlines(keepends=True):
+            text = raw.decode('utf-8', errors='replace').strip()
+            if text:
+                lines.append((offset, text))
+            offset += len(raw)
+
+        def lookup(entry):
+            line_start, line = entry
+            with rate_limit.background():
+                try:
+                    return line_start, line, resolve(*parse_line(line)), None
+                except Exception as error:
+                    return line_start, line, None, error
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watchlist") as pool:
+            found = list(pool.map(lookup, lines))
+        added = self._add_entries(source, [ENTRY_BUILDERS[source](item) for _, _, item, _ in found if item])
+        done_up_to = min((line_start for line_start, _, _, error in found if error), default=start + len(data))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", (key, done_up_to))
+        unmatched = [line for _, line, item, error in found if not item and not error]
+        failed = [line for _, line, _, error in found if error]
+        return added, unmatched, failed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ==========================================
+# 🔄 4. BULK METADATA REFRESH
+# ==========================================
+def refresh(watchlist, source, fetch_item, workers=REFRESH_WORKERS):
+    """Re-fetches every saved entry of `source` concurrently at background priority.
+
+    fetch_item(id) returns the current API item (ratings and poster paths
+    change over time). Returns (updated, failed).
+    """
+    def fetch(item_id):
+        with rate_limit.background():
+            try:
+                return fetch_item(item_id)
+            except Exception:
+                return None
+
+    ids = [entry['id'] for entry in watchlist.entries(source)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watchlist") as pool:
+        items = [item for item in pool.map(fetch, ids) if item]
+    return watchlist.update(source, items), len(ids) - len(items)
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_watchlist():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Watchlist()
+        return _default
+
+if __name__ == "__main__":
+    # python watchlist.py list|import|refresh tmdb|anilist
+    if len(sys.argv) != 3 or sys.argv[1] not in ("list", "import", "refresh") or sys.argv[2] not in TEXT_FILES:
+        print("Usage: python watchlist.py list|import|refresh tmdb|anilist")
+        sys.exit(1)
+    command, source = sys.argv[1:]
+    if source == "tmdb":
+        from app import find_movie as resolve, fetch_movie as fetch_item
+    else:
+        from anime_app import find_anime as resolve, fetch_anime as fetch_item
+    watchlist = get_watchlist()
+    if command == "import":
+        added, unmatched, failed = watchlist.import_text(source, resolve)
+        print(f"📥 Imported {added} titles from {TEXT_FILES[source]}")
+        for line in unmatched:
+            print(f"   ❓ No match for: {line}")
+        for line in failed:
+            print(f"   ⚠️ Lookup failed (retried on the next import): {line}")
+    elif command == "refresh":
+        updated, failed = refresh(watchlist, source, fetch_item)
+        print(f"🔄 Refreshed {updated} titles" + (f" ({failed} failed)" if failed else ""))
+    for entry in watchlist.entries(source):
+        print(f"{entry['title'][:48]:<50} {entry['year'] or '????':<6} {entry['rating'] or '-'}")